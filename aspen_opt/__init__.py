@@ -0,0 +1 @@
+# Shared helpers for the Aspen Plus optimization scripts
@@ -0,0 +1,3 @@
+from aspen_opt.cli import main
+
+main()
@@ -0,0 +1,292 @@
+import math
+import os
+import threading
+import time
+from functools import partial
+
+# Aspen Plus tree paths of the optimization inputs
+INPUT_NODES = {
+    'QN1': r"\Data\Blocks\T1\Input\QN",
+    'QN2': r"\Data\Blocks\T2\Input\QN",
+    'QC': r"\Data\Blocks\T2\Input\Q1",
+    'SF': r"\Data\Blocks\SPLIT1\Input\FRAC\AGUAPR5A",
+}
+
+# Aspen Plus tree paths of the outputs read after each run
+OUTPUT_NODES = {
+    'H2S': r"\Data\Streams\AGUAR1\Output\MOLEFRAC\MIXED\H2S",
+    'NH3': r"\Data\Streams\AGUAR1\Output\MOLEFRAC\MIXED\NH3",
+    'T_bottom_N640': r"\Data\Blocks\T1\Output\B_TEMP\5",
+    'T_bottom_N641': r"\Data\Blocks\T2\Output\B_TEMP\6",
+    'T_top_N641': r"\Data\Blocks\T2\Output\B_TEMP\2",
+    # Number of errors of the last run (0 when the flowsheet converged)
+    'run_errors': r"\Data\Results Summary\Run-Status\Output\PER_ERROR",
+}
+
+TEMPERATURE_OUTPUTS = ['T_bottom_N640', 'T_bottom_N641', 'T_top_N641']
+
+# Aspen Plus processes are told apart by starting them one at a time
+_SPAWN_LOCK = threading.Lock()
+
+
+# A simulation that produced no usable result
+class SimulationError(RuntimeError):
+    pass
+
+
+# A run stopped by the watchdog after its wall-clock limit
+class SimulationTimeout(SimulationError):
+    pass
+
+
+# Result tuple (cH2S_ppm, cNH3_ppm, temperatures) of a failed evaluation, tagged
+# with `failed` and the `error`; see failed_result()
+class FailedResult(tuple):
+    failed = True
+
+    def __new__(cls, values, error=''):
+        result = super().__new__(cls, values)
+        result.error = str(error)
+        return result
+
+
+# What the drivers get for a failed evaluation: `failed_ppm` for H2S and NH3 (a
+# penalty far above the limits), or NaN when None, and NaN temperatures
+def failed_result(error, failed_ppm=None):
+    value = math.nan if failed_ppm is None else float(failed_ppm)
+    return FailedResult((value, value, tuple(math.nan for _ in TEMPERATURE_OUTPUTS)), error)
+
+
+def is_failed(result):
+    return getattr(result, 'failed', False)
+
+
+# PIDs of the running Aspen Plus processes (needs psutil)
+def _aspen_pids():
+    import psutil
+    return {p.pid for p in psutil.process_iter(['name']) if (p.info['name'] or '').lower().startswith('aspenplus')}
+
+
+# Resolves Aspen tree paths with FindNode once and reuses the COM node objects.
+# Handles are dropped by invalidate() when the document is reloaded, and a handle
+# that fails (stale after a reload done elsewhere) is resolved again and retried once.
+class NodeRegistry:
+    def __init__(self, application, input_nodes=INPUT_NODES, output_nodes=OUTPUT_NODES):
+        self.application = application
+        self.input_nodes = input_nodes
+        self.output_nodes = output_nodes
+        self._handles = {}
+
+    def _node(self, path):
+        node = self._handles.get(path)
+        if node is None:
+            node = self.application.Tree.FindNode(path)
+            self._handles[path] = node
+        return node
+
+    def _retry(self, path, action):
+        try:
+            return action(self._node(path))
+        except Exception:
+            self._handles.pop(path, None)
+            return action(self._node(path))
+
+    def set_inputs(self, inputs):
+        for name, value in inputs.items():
+            self._retry(self.input_nodes[name], lambda node: setattr(node, 'Value', value))
+
+    def read_outputs(self, names):
+        return {name: self._retry(self.output_nodes[name], lambda node: node.Value) for name in names}
+
+    def invalidate(self):
+        self._handles.clear()
+
+
+# One Aspen Plus instance with its own copy of the model. DispatchEx starts a
+# separate Aspen process, so several backends can solve at the same time; each
+# backend must be created and used from a single thread (COM apartment). Node
+# handles are cached by a NodeRegistry unless cache_nodes=False, which keeps the
+# old FindNode-per-access behaviour for overhead comparisons. The tree paths of the
+# inputs and outputs default to INPUT_NODES and OUTPUT_NODES. With psutil installed
+# the Aspen process is identified, so it can be killed from another thread and its
+# memory use measured. Any error while setting inputs, running, reading outputs or
+# reloading (COM errors, a node FindNode did not resolve) is raised as
+# SimulationError, the one failure type the drivers handle.
+class AspenBackend:
+    name = 'aspen'
+
+    def __init__(self, model_path, visible=0, cache_nodes=True, input_nodes=INPUT_NODES, output_nodes=OUTPUT_NODES):
+        import pythoncom
+        import win32com.client as win32
+        self._pythoncom = pythoncom
+        pythoncom.CoInitialize()
+        self.model_path = model_path
+        self.cache_nodes = cache_nodes
+        self.killed = False
+        with _SPAWN_LOCK:
+            try:
+                before = _aspen_pids()
+            except ImportError:
+                before = None
+            self.application = win32.DispatchEx('Apwn.Document')  # Registered name of Aspen Plus
+            started = _aspen_pids() - before if before is not None else set()
+        self.pid = started.pop() if len(started) == 1 else None
+        self.application.InitFromArchive2(model_path)
+        self.application.visible = visible
+        self.nodes = NodeRegistry(self.application, input_nodes, output_nodes)
+
+    def set_inputs(self, inputs):
+        try:
+            if not self.cache_nodes:
+                self.nodes.invalidate()
+            self.nodes.set_inputs(inputs)
+        except Exception as e:
+            raise SimulationError(f"Setting the inputs failed: {e}") from e
+
+    def run(self):
+        try:
+            self.application.Engine.Run2()
+        except Exception as e:
+            raise SimulationError(f"Run2 failed: {e}") from e
+
+    def converged(self):
+        return self.read_outputs(['run_errors'])['run_errors'] == 0
+
+    def read_outputs(self, names):
+        try:
+            if not self.cache_nodes:
+                self.nodes.invalidate()
+                return {name: self.application.Tree.FindNode(self.nodes.output_nodes[name]).Value for name in names}
+            return self.nodes.read_outputs(names)
+        except Exception as e:
+            raise SimulationError(f"Reading the outputs failed: {e}") from e
+
+    # Load the archive again (fresh flowsheet state); node handles are rebound
+    def reload(self):
+        self.nodes.invalidate()
+        try:
+            self.application.InitFromArchive2(self.model_path)
+        except Exception as e:
+            raise SimulationError(f"Reloading the archive failed: {e}") from e
+
+    # Whether kill() and memory_mb() can find the Aspen process
+    @property
+    def can_kill(self):
+        return self.pid is not None
+
+    def _process_tree(self):
+        import psutil
+        if self.pid is None:
+            raise SimulationError('The Aspen Plus process is unknown (psutil is needed to kill or measure it)')
+        process = psutil.Process(self.pid)
+        return [process] + process.children(recursive=True)
+
+    # Kill the Aspen process; safe to call from another thread while run() blocks
+    def kill(self):
+        self.killed = True
+        for process in self._process_tree():
+            try:
+                process.kill()
+            except Exception:
+                pass
+
+    # Resident memory of the Aspen process and its children (MB)
+    def memory_mb(self):
+        return sum(process.memory_info().rss for process in self._process_tree()) / 2 ** 20
+
+    def close(self):
+        if not self.killed:
+            self.application.Quit()
+        self._pythoncom.CoUninitialize()
+
+
+# Backend kind selected with the ASPEN_BACKEND environment variable: 'aspen'
+# (default) or 'standin' to run the scripts without Aspen Plus
+def backend_kind():
+    return os.environ.get('ASPEN_BACKEND', 'aspen')
+
+
+# Create a simulator backend for `model_path`. The stand-in's solve latency, noise,
+# warm-start latency, hang rate and failure rate can be set with
+# ASPEN_STANDIN_LATENCY, ASPEN_STANDIN_NOISE, ASPEN_STANDIN_JUMP_LATENCY,
+# ASPEN_STANDIN_HANG_RATE and ASPEN_STANDIN_FAILURE_RATE. With
+# a run timeout (s), a run limit or a memory limit (MB), also set with
+# ASPEN_RUN_TIMEOUT, ASPEN_RECYCLE_RUNS and ASPEN_RECYCLE_MEMORY_MB, the backend is
+# wrapped in a Watchdog.
+def make_backend(model_path, kind=None, timeout=None, max_runs=None, max_memory_mb=None, **options):
+    timeout = timeout or float(os.environ.get('ASPEN_RUN_TIMEOUT', 0)) or None
+    max_runs = max_runs or int(os.environ.get('ASPEN_RECYCLE_RUNS', 0)) or None
+    max_memory_mb = max_memory_mb or float(os.environ.get('ASPEN_RECYCLE_MEMORY_MB', 0)) or None
+    if timeout or max_runs or max_memory_mb:
+        from aspen_opt.watchdog import Watchdog
+        return Watchdog(partial(_create_backend, model_path, kind, **options), timeout, max_runs, max_memory_mb)
+    return _create_backend(model_path, kind, **options)
+
+
+def _create_backend(model_path, kind=None, **options):
+    kind = kind or backend_kind()
+    if kind == 'aspen':
+        return AspenBackend(model_path, **options)
+    if kind == 'standin':
+        from aspen_opt.standin import StandInBackend
+        options.setdefault('latency', float(os.environ.get('ASPEN_STANDIN_LATENCY', 0)))
+        options.setdefault('noise', float(os.environ.get('ASPEN_STANDIN_NOISE', 0)))
+        options.setdefault('jump_latency', float(os.environ.get('ASPEN_STANDIN_JUMP_LATENCY', 0)))
+        options.setdefault('hang_rate', float(os.environ.get('ASPEN_STANDIN_HANG_RATE', 0)))
+        options.setdefault('failure_rate', float(os.environ.get('ASPEN_STANDIN_FAILURE_RATE', 0)))
+        return StandInBackend(model_path, **options)
+    raise ValueError(f"Unknown simulator backend: {kind}")
+
+
+def _evaluate_once(backend, inputs, timer):
+    if timer is None:
+        backend.set_inputs(inputs)
+        backend.run()
+        converged = backend.converged()
+        outputs = backend.read_outputs(['H2S', 'NH3'] + TEMPERATURE_OUTPUTS)
+    else:
+        with timer.evaluation(inputs=inputs):
+            with timer.time('set_inputs'):
+                backend.set_inputs(inputs)
+            with timer.time('run'):
+                backend.run()
+            with timer.time('read_outputs'):
+                converged = backend.converged()
+                outputs = backend.read_outputs(['H2S', 'NH3'] + TEMPERATURE_OUTPUTS)
+    if not converged:
+        raise SimulationError('The flowsheet did not converge')
+    if any(value is None or not math.isfinite(value) for value in outputs.values()):
+        raise SimulationError('The run produced no results')
+    temperatures = tuple(outputs[name] for name in TEMPERATURE_OUTPUTS)
+    return outputs['H2S'] * 1E6, outputs['NH3'] * 1E6, temperatures
+
+
+# Run one point on a backend; returns (cH2S_ppm, cNH3_ppm, temperatures), the
+# same tuple the scripts keep in the simulation cache and result store. With a
+# PhaseTimer, the set_inputs/run/read_outputs phases are timed and traced.
+# The run status is checked: a run that did not converge (or produced no results)
+# is retried `retries` times from a reloaded archive, then SimulationError is raised.
+def evaluate(backend, inputs, timer=None, retries=1):
+    inputs = dict(inputs)
+    if 'SF' in inputs:
+        inputs['SF'] = max(0, inputs['SF'])
+    for attempt in range(retries + 1):
+        try:
+            return _evaluate_once(backend, inputs, timer)
+        except SimulationError:
+            if attempt == retries:
+                raise
+            backend.reload()
+
+
+# Mean time per evaluation spent outside run(): setting the inputs and reading the
+# outputs. Compare AspenBackend(path, cache_nodes=False) with the default to see
+# what the node registry saves.
+def measure_overhead(backend, inputs, repeats=100):
+    backend.set_inputs(inputs)
+    backend.run()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        backend.set_inputs(inputs)
+        backend.read_outputs(['H2S', 'NH3'] + TEMPERATURE_OUTPUTS)
+    return (time.perf_counter() - start) / repeats
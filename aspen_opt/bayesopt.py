@@ -0,0 +1,232 @@
+import argparse
+import os
+import tempfile
+
+import numpy as np
+from scipy.linalg import cho_solve, cholesky
+from scipy.optimize import OptimizeResult, minimize
+from scipy.stats import norm, qmc
+
+
+# Gaussian-process regression with an anisotropic Matern 5/2 kernel on the unit box.
+# Targets are standardized; the length scales, signal variance and noise variance
+# are fitted by maximizing the log marginal likelihood (L-BFGS-B from a few starts).
+class GaussianProcess:
+    def __init__(self, restarts=3, seed=0):
+        self.restarts = restarts
+        self._rng = np.random.default_rng(seed)
+        self.theta = None
+
+    def _kernel(self, A, B, theta):
+        lengths, signal = np.exp(theta[:-2]), np.exp(theta[-2])
+        r = np.sqrt(np.maximum(np.sum(((A[:, None, :] - B[None, :, :]) / lengths) ** 2, axis=-1), 0.0))
+        return signal * (1 + np.sqrt(5) * r + 5 * r ** 2 / 3) * np.exp(-np.sqrt(5) * r)
+
+    def _factor(self, theta):
+        K = self._kernel(self.X, self.X, theta) + (np.exp(theta[-1]) + 1e-10) * np.eye(len(self.X))
+        return cholesky(K, lower=True)
+
+    def _negative_log_likelihood(self, theta):
+        try:
+            L = self._factor(theta)
+        except np.linalg.LinAlgError:
+            return 1e10
+        alpha = cho_solve((L, True), self.y)
+        return 0.5 * self.y @ alpha + np.sum(np.log(np.diag(L)))
+
+    def fit(self, X, y, optimize=True):
+        self.X = np.asarray(X, dtype=float)
+        y = np.asarray(y, dtype=float)
+        self.mean = y.mean()
+        self.std = y.std() or 1.0
+        self.y = (y - self.mean) / self.std
+        d = self.X.shape[1]
+        bounds = [(np.log(1e-2), np.log(1e1))] * d + [(np.log(1e-2), np.log(1e2)), (np.log(1e-8), np.log(1e-1))]
+        if optimize or self.theta is None:
+            starts = [np.array([np.log(0.3)] * d + [0.0, np.log(1e-4)])]
+            if self.theta is not None:
+                starts.append(self.theta)
+            for _ in range(self.restarts - 1):
+                starts.append(np.array([self._rng.uniform(low, high) for low, high in bounds]))
+            fits = [minimize(self._negative_log_likelihood, start, method='L-BFGS-B', bounds=bounds) for start in starts]
+            self.theta = min(fits, key=lambda fit: fit.fun).x
+        self._L = self._factor(self.theta)
+        self._alpha = cho_solve((self._L, True), self.y)
+        return self
+
+    # Posterior mean and standard deviation at the rows of `X`
+    def predict(self, X):
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        K_s = self._kernel(X, self.X, self.theta)
+        mean = K_s @ self._alpha
+        v = cho_solve((self._L, True), K_s.T)
+        variance = np.maximum(np.exp(self.theta[-2]) - np.sum(K_s * v.T, axis=1), 1e-12)
+        return self.mean + self.std * mean, self.std * np.sqrt(variance)
+
+
+# Batch-parallel constrained Bayesian optimization. The plant cost `objective` is
+# known exactly, so only the simulated outputs are modelled: one GaussianProcess
+# per limited output, on log ppm in the unit box. The acquisition is the
+# improvement of the cost over the best feasible point found so far weighted by
+# the probability that every output meets its limit (the probability of
+# feasibility alone until a feasible point is known). Each round proposes `q`
+# points by the kriging believer heuristic (each chosen point is added to the
+# models with its predicted outputs before choosing the next) and hands them to
+# `simulate_batch` together, so a pool of q simulators solves them concurrently.
+# `simulate_batch` has the surrogate_minimize contract (first len(limits) outputs,
+# None for a failed simulation); failed points are kept out of the models and
+# never proposed again. Starts with x0 and a Latin hypercube of `initial` points;
+# stops after `max_simulations` simulations, after `maxiter` rounds when set, or
+# when no candidate is expected to improve the cost by `ftol` (relative). The
+# result has the fields the scripts report (x, fun, nfev, nit, maxcv, success,
+# message).
+def bayesian_minimize(objective, simulate_batch, x0, bounds, limits, q=4, initial=None, max_simulations=60,
+                      candidates=2048, ftol=1e-6, feas_tol=1e-6, seed=0, maxiter=None):
+    lower = np.array([low for low, _ in bounds], dtype=float)
+    upper = np.array([high for _, high in bounds], dtype=float)
+    span = upper - lower
+    limits = np.asarray(limits, dtype=float)
+    log_limits = np.log(limits)
+    n = len(lower)
+    initial = initial or max(q, 2 * n)
+    rng = np.random.default_rng(seed)
+
+    def from_unit(u):
+        return lower + np.asarray(u, dtype=float) * span
+
+    def cost(u):
+        return objective(from_unit(u))
+
+    samples, outputs, failures = [], [], []
+
+    def evaluate(points):
+        results = simulate_batch([from_unit(u) for u in points])
+        for u, result in zip(points, results):
+            y = None if result is None else np.asarray(result[:len(limits)], dtype=float)
+            if y is not None and np.all(np.isfinite(y)) and np.all(y > 0):
+                samples.append(np.asarray(u, dtype=float))
+                outputs.append(y)
+            else:
+                failures.append(np.asarray(u, dtype=float))
+
+    def incumbent():
+        best = None
+        for u, y in zip(samples, outputs):
+            violation = float(np.max(np.maximum(y - limits, 0.0)))
+            key = (violation > feas_tol, violation if violation > feas_tol else cost(u))
+            if best is None or key < best[0]:
+                best = (key, u, violation)
+        return best
+
+    x0_unit = (np.asarray(x0, dtype=float) - lower) / span
+    design = qmc.LatinHypercube(d=n, seed=seed).random(initial - 1)
+    evaluate([x0_unit] + list(design))
+
+    models = [GaussianProcess(seed=seed + k) for k in range(len(limits))]
+    nit = 0
+    message = 'Maximum number of simulations reached'
+    while len(samples) + len(failures) < max_simulations:
+        if maxiter is not None and nit >= maxiter:
+            message = 'Maximum number of iterations reached'
+            break
+        nit += 1
+        if len(samples) < 2:
+            message = 'Too few successful simulations to fit the models'
+            break
+        X = np.array(samples)
+        Y = np.log(np.array(outputs))
+        for k, model in enumerate(models):
+            model.fit(X, Y[:, k])
+        (infeasible, best_cost), best_u, _ = incumbent()
+        have_feasible = not infeasible
+
+        def acquisition(U):
+            U = np.atleast_2d(U)
+            feasible = np.ones(len(U))
+            for k, model in enumerate(models):
+                mean, std = model.predict(U)
+                feasible *= norm.cdf((log_limits[k] - mean) / std)
+            if not have_feasible:
+                return feasible
+            improvement = np.maximum(best_cost - np.array([cost(u) for u in U]), 0.0) / abs(best_cost)
+            return improvement * feasible
+
+        # Kriging believer: choose q points, adding each one's predicted outputs
+        # to the models (hyperparameters kept) before choosing the next
+        batch = []
+        seen = np.array(samples + failures)
+        sobol = qmc.Sobol(d=n, seed=rng.integers(1 << 31)).random(candidates)
+        for _ in range(min(q, max_simulations - len(samples) - len(failures))):
+            # Global Sobol candidates, then local clouds around the best of them and
+            # around the incumbent (improvements are usually close to it)
+            values = acquisition(sobol)
+            centres = np.vstack([sobol[np.argsort(values)[-8:]], best_u])
+            local = [np.repeat(centres, candidates // 64, axis=0) + rng.normal(0, scale, (len(centres) * (candidates // 64), n))
+                     for scale in (0.005, 0.05)]
+            pool = np.clip(np.vstack([centres] + local), 0, 1)
+            pool_values = acquisition(pool)
+            u, value = pool[np.argmax(pool_values)], np.max(pool_values)
+            if np.min(np.linalg.norm(seen - u, axis=1)) < 1e-6:
+                break
+            if have_feasible and value < ftol:
+                break
+            batch.append(u)
+            seen = np.vstack([seen, u])
+            X = np.vstack([X, u])
+            Y = np.vstack([Y, [model.predict(u)[0][0] for model in models]])
+            for k, model in enumerate(models):
+                model.fit(X, Y[:, k], optimize=False)
+        if not batch:
+            message = 'No candidate is expected to improve the cost by ftol'
+            break
+        evaluate(batch)
+
+    best = incumbent()
+    if best is None:
+        return OptimizeResult(x=from_unit(x0_unit), fun=cost(x0_unit), nfev=len(failures), nit=nit, maxcv=np.inf,
+                              success=False, message='Every simulation failed')
+    _, u, violation = best
+    return OptimizeResult(x=from_unit(u), fun=cost(u), nfev=len(samples) + len(failures), nit=nit, maxcv=violation,
+                          success=violation <= feas_tol, message=message)
+
+
+# Run serial COBYLA (one simulator) and batch Bayesian optimization (q simulators),
+# each on an empty result store, and report the best feasible cost against wall
+# time. Set ASPEN_STANDIN_LATENCY to give the stand-in a realistic solve time.
+def compare(model_path, variables=4, q=4, max_simulations=60, output_dir='.', backend=None):
+    from aspen_opt.optimizer import OptimizationRun
+
+    runs = []
+    with tempfile.TemporaryDirectory() as store_dir:
+        for method, workers, options in [('COBYLA', 1, {}),
+                                         ('bayesian', q, {'q': q, 'max_simulations': max_simulations})]:
+            run = OptimizationRun(model_path, variables, method, output_dir=output_dir, backend=backend, workers=workers,
+                                  options=options, store_path=os.path.join(store_dir, method + '.sqlite'))
+            result = run.run()
+            runs.append((method, workers, run, result))
+    # Best feasible cost of the two, the common target; None if neither run is feasible
+    best = min((result.fun for _, _, run, result in runs if result.maxcv <= 1e-4), default=None)
+    lines = [f"{'method':<10} {'workers':>7} {'cost':>12} {'simulations':>12} {'wall s':>8} {'sims/hour':>10} "
+             f"{'s to within 0.1% of best':>25}"]
+    for method, workers, run, result in runs:
+        wall = run.history[-1][3] if run.history else 0.0
+        reached = None if best is None else run.time_to_optimum(best, rtol=1e-3)
+        lines.append(f"{method:<10} {workers:>7} {result.fun:>12.1f} {run.simulations:>12} {wall:>8.1f} "
+                     f"{3600 * run.simulations / max(wall, 1e-9):>10.0f} {'-' if reached is None else f'{reached:.1f}':>25}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare batch Bayesian optimization with serial COBYLA')
+    parser.add_argument('--model', default='UTAA_revK.bkp')
+    parser.add_argument('--variables', type=int, default=4, choices=[3, 4])
+    parser.add_argument('--q', type=int, default=4, help='points per batch (and simulator instances)')
+    parser.add_argument('--max-simulations', type=int, default=60)
+    parser.add_argument('--output-dir', default='.')
+    parser.add_argument('--backend', choices=['standin', 'aspen'])
+    args = parser.parse_args(argv)
+    print(compare(args.model, args.variables, args.q, args.max_simulations, args.output_dir, args.backend))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from functools import partial
+
+import numpy as np
+from scipy.optimize import minimize
+from scipy.stats import qmc
+
+from aspen_opt.backends import make_backend
+from aspen_opt.gradients import ParallelJacobian
+from aspen_opt.optimizer import METHOD_OPTIONS, PENALTY_WEIGHT
+from aspen_opt.pool import SimulatorPool
+from aspen_opt.problem import PROBLEMS
+from aspen_opt.simulator import SharedSimulator
+
+# Problem variants of the scripts: input names, initial guess, scale factors and non-scaled bounds
+VARIANTS = {variables: problem.variant() for variables, problem in PROBLEMS.items()}
+
+# H2S and NH3 limits (ppm)
+LIMITS = tuple(limit.limit for limit in PROBLEMS[4].limits)
+
+# Methods as configured in the scripts; COBYLA_SM runs against the simplified model
+METHODS = ['COBYLA', 'COBYLA_SM', 'SLSQP', 'L-BFGS-B']
+MODEL_FILES = {'COBYLA_SM': 'UTAA_revK_SM.bkp'}
+
+# The simplified model only has 3-variable runs (SF stays at its archive value)
+METHOD_VARIABLES = {'COBYLA_SM': (3,)}
+DEFAULT_MODEL_FILE = 'UTAA_revK.bkp'
+
+FIELDS = ['method', 'variables', 'start', 'x0', 'simulations', 'wall_time_s', 'final_cost', 'max_violation',
+          'best_feasible_cost', 'success', 'message']
+
+
+# Initial guesses: the scripts' x0 followed by a Latin hypercube over the bounds
+def starting_points(variables, starts, seed=0):
+    _, x0, _, bounds = VARIANTS[variables]
+    points = [list(map(float, x0))]
+    if starts > 1:
+        sample = qmc.LatinHypercube(d=variables, seed=seed).random(starts - 1)
+        lower, upper = np.array(bounds, dtype=float).T
+        points += qmc.scale(sample, lower, upper).tolist()
+    return points
+
+
+# Minimize with one of METHODS configured as in the scripts (optimizer.OptimizationRun):
+# COBYLA and SLSQP with native bounds and the vector constraint of `problem`,
+# L-BFGS-B on the penalized cost, SLSQP and L-BFGS-B with the exact cost gradient.
+# `outputs(x_scaled)` returns the limited outputs of a (cached) simulation and
+# `jacobian` is a ParallelJacobian on the same simulations.
+def solve(method, problem, outputs, x0_scaled, jacobian):
+    options = METHOD_OPTIONS.get('COBYLA' if method == 'COBYLA_SM' else method)
+    bounds = problem.bounds()
+    if method in ('COBYLA', 'COBYLA_SM'):
+        return minimize(problem.cost, x0_scaled, method='COBYLA', bounds=bounds, constraints=problem.constraint(outputs),
+                        options=options)
+    if method == 'SLSQP':
+        return minimize(problem.cost, x0_scaled, method='SLSQP', jac=lambda x: problem.cost_gradient(), bounds=bounds,
+                        constraints=problem.constraint(outputs, jac=jacobian.jacobian(outputs)), options=options)
+    if method == 'L-BFGS-B':
+        def penalized_cost_and_gradient(x_scaled):
+            y = outputs(x_scaled)
+            value = problem.cost(x_scaled) + PENALTY_WEIGHT * problem.penalty(y)
+            gradient = problem.cost_gradient()
+            if problem.penalty(y) > 0:
+                gradient = gradient + PENALTY_WEIGHT * problem.penalty_gradient(y, jacobian.jacobian(outputs)(x_scaled))
+            return value, gradient
+
+        return minimize(penalized_cost_and_gradient, x0_scaled, method='L-BFGS-B', jac=True, bounds=bounds,
+                        options=options)
+    raise ValueError(f"Unknown method: {method}")
+
+
+# Run one method from one initial guess on a single simulator instance behind a
+# SharedSimulator (no result store), counting each distinct simulated point once
+# and tracking the best feasible point evaluated. A failed simulation reports
+# `failure_ppm` for H2S and NH3, as in the scripts.
+def run_case(method, variables, x0, backend_kind='standin', backend_options=None, failure_ppm=1e3):
+    problem = PROBLEMS[variables]
+    best = {'cost': np.inf}
+
+    def track(x_scaled, result, elapsed_s):
+        if np.max(problem.violations(result)) <= 0 and problem.cost(x_scaled) < best['cost']:
+            best['cost'] = problem.cost(x_scaled)
+
+    model_path = os.path.abspath(MODEL_FILES.get(method, DEFAULT_MODEL_FILE))
+    factory = partial(make_backend, model_path, backend_kind, **(backend_options or {}))
+    with SimulatorPool(factory) as pool:
+        simulator = SharedSimulator(pool, problem.names, failure_ppm=failure_ppm, unscale=problem.unscale,
+                                    on_result=track)
+
+        def outputs(x_scaled):
+            return problem.outputs(simulator(x_scaled))
+
+        jacobian = ParallelJacobian(simulator.simulate_batch, bounds=problem.bounds_scaled)
+        start = time.perf_counter()
+        result = solve(method, problem, outputs, problem.scale(x0), jacobian)
+        wall_time = time.perf_counter() - start
+        simulations = simulator.simulations
+
+        # Constraint check of the returned point (not counted as an optimizer simulation)
+        max_violation = float(np.max(problem.violations(simulator(result.x))))
+    return {
+        'method': method,
+        'variables': variables,
+        'x0': [float(v) for v in x0],
+        'simulations': simulations,
+        'wall_time_s': wall_time,
+        'final_cost': problem.cost(result.x),
+        'max_violation': max_violation,
+        'best_feasible_cost': float(best['cost']) if np.isfinite(best['cost']) else None,
+        'success': bool(result.success),
+        'message': str(result.message),
+    }
+
+
+def run_benchmark(methods=METHODS, variables=(3, 4), starts=5, seed=0, backend_kind='standin', backend_options=None):
+    rows = []
+    for n in variables:
+        for index, x0 in enumerate(starting_points(n, starts, seed)):
+            for method in methods:
+                if n not in METHOD_VARIABLES.get(method, VARIANTS):
+                    continue
+                row = run_case(method, n, x0, backend_kind, backend_options)
+                row['start'] = index
+                rows.append(row)
+    return rows
+
+
+def write_rows(rows, path=None, fmt='csv'):
+    out = sys.stdout if path is None else open(path, 'w', newline='')
+    try:
+        if fmt == 'json':
+            json.dump(rows, out, indent=2)
+            out.write('\n')
+        else:
+            writer = csv.DictWriter(out, fieldnames=FIELDS)
+            writer.writeheader()
+            for row in rows:
+                writer.writerow(dict(row, x0=' '.join(f"{v:g}" for v in row['x0'])))
+    finally:
+        if path is not None:
+            out.close()
+
+
+# One line per method and variable set: median simulations to convergence, mean
+# wall time, best feasible cost over all starts and worst final violation
+def summarize(rows):
+    lines = [f"{'method':<10} {'vars':>4} {'sims (median)':>14} {'wall s (mean)':>14} {'best feasible':>14} {'max viol':>10}"]
+    for n in sorted({row['variables'] for row in rows}):
+        for method in dict.fromkeys(row['method'] for row in rows):
+            group = [row for row in rows if row['method'] == method and row['variables'] == n]
+            if not group:
+                continue
+            feasible = [row['best_feasible_cost'] for row in group if row['best_feasible_cost'] is not None]
+            lines.append(
+                f"{method:<10} {n:>4} {np.median([row['simulations'] for row in group]):>14.1f} "
+                f"{np.mean([row['wall_time_s'] for row in group]):>14.3f} "
+                f"{min(feasible) if feasible else float('nan'):>14.1f} "
+                f"{max(row['max_violation'] for row in group):>10.3g}"
+            )
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare the optimization methods on a deterministic simulator stand-in')
+    parser.add_argument('--methods', nargs='+', default=METHODS, choices=METHODS)
+    parser.add_argument('--variables', nargs='+', type=int, default=[3, 4], choices=sorted(VARIANTS))
+    parser.add_argument('--starts', type=int, default=5, help='initial guesses per method (x0 plus a Latin hypercube)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--backend', default='standin', choices=['standin', 'aspen'])
+    parser.add_argument('--latency', type=float, default=0.0, help='stand-in solve time per simulation (s)')
+    parser.add_argument('--output', help='results file (default: stdout)')
+    parser.add_argument('--format', choices=['csv', 'json'], help='default: from the output extension, else csv')
+    args = parser.parse_args(argv)
+
+    backend_options = {'latency': args.latency} if args.backend == 'standin' else {}
+    rows = run_benchmark(args.methods, args.variables, args.starts, args.seed, args.backend, backend_options)
+    fmt = args.format or ('json' if args.output and args.output.endswith('.json') else 'csv')
+    write_rows(rows, args.output, fmt)
+    print(summarize(rows), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
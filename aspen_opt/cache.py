@@ -0,0 +1,78 @@
+import math
+from collections import OrderedDict
+from itertools import product
+
+
+# In-memory cache of simulation results keyed on the scaled input vector.
+# Two vectors are treated as the same point when every component differs by at
+# most `tol`; the least recently used entry is evicted once `maxsize` is reached.
+# Stored keys are indexed by their cell on a grid of size `tol`, so a lookup only
+# compares against the keys in the cell of the point and its neighbours instead of
+# scanning every entry.
+class SimulationCache:
+    def __init__(self, tol=1e-9, maxsize=1024):
+        self.tol = tol
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._cells = {}
+
+    def _cell(self, key):
+        return tuple(math.floor(v / self.tol) for v in key)
+
+    def _find_key(self, x_scaled):
+        key = tuple(float(v) for v in x_scaled)
+        if key in self._entries:
+            return key
+        if self.tol > 0 and self._cells:
+            cell = self._cell(key)
+            for offset in product((0, -1, 1), repeat=len(cell)):
+                for stored_key in self._cells.get(tuple(c + o for c, o in zip(cell, offset)), ()):
+                    if len(stored_key) == len(key) and all(abs(a - b) <= self.tol for a, b in zip(stored_key, key)):
+                        return stored_key
+        return None
+
+    def _index(self, key):
+        if self.tol > 0:
+            self._cells.setdefault(self._cell(key), []).append(key)
+
+    def _unindex(self, key):
+        if self.tol > 0:
+            cell = self._cell(key)
+            keys = self._cells[cell]
+            keys.remove(key)
+            if not keys:
+                del self._cells[cell]
+
+    def get(self, x_scaled):
+        key = self._find_key(x_scaled)
+        if key is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return self._entries[key]
+
+    def put(self, x_scaled, value):
+        key = self._find_key(x_scaled)
+        if key is None:
+            key = tuple(float(v) for v in x_scaled)
+            self._index(key)
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            evicted, _ = self._entries.popitem(last=False)
+            self._unindex(evicted)
+
+    # Membership test that does not count as a hit or miss
+    def __contains__(self, x_scaled):
+        return self._find_key(x_scaled) is not None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def summary(self):
+        total = self.hits + self.misses
+        hit_rate = 100 * self.hits / total if total else 0.0
+        return f"Simulation cache: {self.hits} hits, {self.misses} misses ({hit_rate:.1f}% hit rate), {len(self)} entries"
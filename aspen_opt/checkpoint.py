@@ -0,0 +1,82 @@
+import json
+import os
+import time
+
+from aspen_opt.backends import FailedResult, is_failed
+
+
+# Resume mode is selected with the ASPEN_RESUME environment variable (ASPEN_RESUME=1)
+def resume_requested():
+    return os.environ.get('ASPEN_RESUME', '0') not in ('', '0')
+
+
+# Periodic checkpoint of an optimization run: the run settings (method, scaled x0,
+# options, model), and every simulation result in the order the optimizer asked
+# for it, written atomically to a JSON file at most every `interval` seconds.
+# SciPy's optimizers are deterministic given the function values, so resuming
+# restarts the optimizer from x0 with the simulation cache preloaded from the
+# checkpoint: the evaluations already paid for are replayed from the cache, the
+# optimizer reaches the state it had when the run stopped, and only then new
+# simulations are run. Results newer than the last checkpoint are still in the
+# persistent result store.
+class Checkpoint:
+    def __init__(self, path, interval=10.0, **settings):
+        self.path = path
+        self.interval = interval
+        self.settings = json.loads(json.dumps(settings, default=float))
+        self.evaluations = []
+        self.replayed = 0
+        # Whether the restored checkpoint was written by a run whose optimizer returned
+        self.restored_complete = False
+        self._last_save = time.monotonic()
+
+    # Preload `cache` with the evaluations of an earlier run with the same settings,
+    # and `failures` with its failed ones; returns the number of evaluations that
+    # will be replayed
+    def restore(self, cache, failures):
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path) as f:
+            state = json.load(f)
+        if state['settings'] != self.settings:
+            raise ValueError(f"Checkpoint {self.path} was written by a run with different settings: {state['settings']}")
+        cache.maxsize = max(cache.maxsize, len(state['evaluations']))
+        for x_scaled, (cH2S_ppm, cNH3_ppm, temperatures), *error in state['evaluations']:
+            result = (cH2S_ppm, cNH3_ppm, tuple(temperatures))
+            if error:
+                failures.put(x_scaled, FailedResult(result, error[0]))
+            else:
+                cache.put(x_scaled, result)
+        self.evaluations = state['evaluations']
+        self.replayed = len(self.evaluations)
+        self.restored_complete = state.get('complete', False)
+        return self.replayed
+
+    # Add a result the optimizer has not seen before (new simulation, result store hit
+    # or failure)
+    def add(self, x_scaled, result):
+        cH2S_ppm, cNH3_ppm, temperatures = result
+        evaluation = [[float(v) for v in x_scaled], [float(cH2S_ppm), float(cNH3_ppm), [float(t) for t in temperatures]]]
+        if is_failed(result):
+            evaluation.append(result.error)
+        self.evaluations.append(evaluation)
+        if time.monotonic() - self._last_save >= self.interval:
+            self.save()
+
+    def save(self, complete=False):
+        state = {'settings': self.settings, 'complete': complete, 'saved': time.time(), 'evaluations': self.evaluations}
+        temporary_path = self.path + '.tmp'
+        with open(temporary_path, 'w') as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary_path, self.path)
+        self._last_save = time.monotonic()
+
+    # Final checkpoint; `complete` only when the optimizer returned normally, so an
+    # interrupted run stays marked as one
+    def close(self, complete=False):
+        self.save(complete=complete)
+
+    def summary(self):
+        return f"Checkpoint {os.path.basename(self.path)}: {len(self.evaluations)} evaluations ({self.replayed} replayed)"
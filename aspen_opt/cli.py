@@ -0,0 +1,74 @@
+import argparse
+import ast
+
+# Only argparse is loaded before the arguments are parsed; SciPy, the simulator
+# backends and matplotlib are imported when a run actually needs them, so
+# `--help` and headless batch runs start fast
+
+METHODS = ['COBYLA', 'SLSQP', 'trust-constr', 'L-BFGS-B', 'augmented-lagrangian', 'surrogate', 'bayesian']
+
+
+# key=value optimizer option; the value is a Python literal when it parses as one
+def option(text):
+    key, sep, value = text.partition('=')
+    if not sep:
+        raise argparse.ArgumentTypeError(f"expected key=value, got {text!r}")
+    try:
+        return key, ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return key, value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m aspen_opt', description='Optimize the UTAA flowsheet')
+    parser.add_argument('--model', default='UTAA_revK.bkp', help='Aspen Plus archive (.bkp)')
+    parser.add_argument('--variables', type=int, default=4, choices=[3, 4], help='QN1, QN2, QC (and SF)')
+    parser.add_argument('--method', default='COBYLA', choices=METHODS)
+    parser.add_argument('--name', help='base name of the log and output files')
+    parser.add_argument('--output-dir', default='.', help='directory of the log and output files')
+    parser.add_argument('--x0', type=float, nargs='+', help='initial guess (non-scaled)')
+    parser.add_argument('--option', type=option, action='append', default=[], metavar='KEY=VALUE',
+                        help='optimizer option, e.g. --option maxiter=200 (repeatable)')
+    parser.add_argument('--limit', type=option, action='append', default=[], metavar='NAME=PPM',
+                        help='H2S or NH3 limit in place of 0.2 and 15 ppm, e.g. --limit H2S=0.1 (repeatable)')
+    parser.add_argument('--workers', type=int, help='simulator instances (default: one finite-difference batch)')
+    parser.add_argument('--fd-scheme', default='forward', choices=['forward', 'central'])
+    parser.add_argument('--failure-ppm', type=float, default=1e3,
+                        help='H2S and NH3 reported for a failed simulation')
+    parser.add_argument('--cache-tol', type=float, default=1e-9,
+                        help='treat scaled points within this distance (every component) as the same point')
+    parser.add_argument('--backend', choices=['standin', 'aspen'], help='default: ASPEN_BACKEND or aspen')
+    parser.add_argument('--resume', action='store_true', help='replay the checkpoint of an interrupted run')
+    parser.add_argument('--plot', action='append', default=[], choices=['3d', 'evolution'],
+                        help='save the 3D trajectory or the evolution plots (repeatable)')
+    parser.add_argument('--show', action=argparse.BooleanOptionalAction, default=False,
+                        help='also show the plots on screen (in the render process)')
+    parser.add_argument('--max-plot-points', type=int, default=2000, help='decimate longer trajectories in the plots')
+    args = parser.parse_args(argv)
+    if args.x0 is not None and len(args.x0) != args.variables:
+        parser.error(f"--x0 needs {args.variables} values")
+    for name, value in args.limit:
+        if name not in ('H2S', 'NH3') or not isinstance(value, (int, float)):
+            parser.error(f"--limit expects H2S=PPM or NH3=PPM, got {name}={value}")
+
+    from aspen_opt.checkpoint import resume_requested
+    from aspen_opt.optimizer import OptimizationRun
+
+    run = OptimizationRun(args.model, args.variables, args.method, name=args.name, output_dir=args.output_dir,
+                          options=dict(args.option), x0=args.x0, workers=args.workers, fd_scheme=args.fd_scheme,
+                          failure_ppm=args.failure_ppm, backend=args.backend, limits=dict(args.limit),
+                          cache_tol=args.cache_tol)
+    result = run.run(resume=args.resume or resume_requested())
+
+    # The plots are rendered from the trajectory CSV by a separate process, so the
+    # run (and the next one in a batch) never waits for them or for plt.show()
+    if args.plot:
+        from aspen_opt.plots import render_in_background
+
+        render_in_background(run.recorder.path, run.output_path(''), args.plot, run.unscale(result.x), result.fun,
+                             show=args.show, max_points=args.max_plot_points)
+    return result
+
+
+if __name__ == '__main__':
+    main()
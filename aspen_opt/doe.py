@@ -0,0 +1,218 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from functools import partial
+from itertools import product
+
+import numpy as np
+from scipy.stats import qmc
+
+from aspen_opt.backends import TEMPERATURE_OUTPUTS, backend_kind, make_backend
+from aspen_opt.benchmark import DEFAULT_MODEL_FILE, LIMITS, VARIANTS
+from aspen_opt.pool import SimulatorPool
+from aspen_opt.scheduling import JumpLimit, schedule_chains, unit_scale
+from aspen_opt.store import ResultStore
+from aspen_opt.timing import PhaseTimer
+
+DESIGNS = ['lhs', 'sobol', 'factorial']
+
+# Columns of outputs.npy
+OUTPUT_NAMES = ['H2S_ppm', 'NH3_ppm'] + TEMPERATURE_OUTPUTS
+
+# Values of status.npy
+PENDING, DONE, FAILED = 0, 1, -1
+
+
+# Design points (non-scaled) within `bounds`. Latin hypercube and Sobol designs have
+# `points` rows; a full-factorial design has `levels` evenly spaced levels per input
+# (one number for all inputs, or one per input).
+def make_design(kind, bounds, points=None, levels=None, seed=0):
+    lower, upper = np.array(bounds, dtype=float).T
+    d = len(bounds)
+    if kind == 'lhs':
+        sample = qmc.LatinHypercube(d=d, seed=seed).random(points)
+    elif kind == 'sobol':
+        sampler = qmc.Sobol(d=d, scramble=True, seed=seed)
+        m = int(np.log2(points))
+        sample = sampler.random_base2(m) if 2 ** m == points else sampler.random(points)
+    elif kind == 'factorial':
+        levels = np.broadcast_to(levels, (d,))
+        sample = np.array(list(product(*(np.linspace(0, 1, int(n)) for n in levels))))
+    else:
+        raise ValueError(f"Unknown design: {kind}")
+    return qmc.scale(sample, lower, upper)
+
+
+# A design and its results as .npy files in one directory: design.npy (points x
+# inputs), outputs.npy (points x OUTPUT_NAMES, NaN until solved), status.npy and
+# elapsed_s.npy, plus meta.json. The result arrays are preallocated and memory-mapped,
+# so results are written in place as they arrive and a sweep can be resumed after
+# an interruption from the points still pending.
+class Sweep:
+    def __init__(self, directory, mode='r+'):
+        self.directory = directory
+        with open(os.path.join(directory, 'meta.json')) as f:
+            self.meta = json.load(f)
+        self.names = self.meta['names']
+        self.design = np.load(os.path.join(directory, 'design.npy'))
+        self.outputs = np.load(os.path.join(directory, 'outputs.npy'), mmap_mode=mode)
+        self.status = np.load(os.path.join(directory, 'status.npy'), mmap_mode=mode)
+        self.elapsed_s = np.load(os.path.join(directory, 'elapsed_s.npy'), mmap_mode=mode)
+
+    @classmethod
+    def create(cls, directory, names, points, **meta):
+        os.makedirs(directory, exist_ok=True)
+        n = len(points)
+        np.save(os.path.join(directory, 'design.npy'), np.asarray(points, dtype=float))
+        np.lib.format.open_memmap(os.path.join(directory, 'outputs.npy'), mode='w+', dtype=float,
+                                  shape=(n, len(OUTPUT_NAMES)))[:] = np.nan
+        np.lib.format.open_memmap(os.path.join(directory, 'status.npy'), mode='w+', dtype=np.int8, shape=(n,))[:] = PENDING
+        np.lib.format.open_memmap(os.path.join(directory, 'elapsed_s.npy'), mode='w+', dtype=float, shape=(n,))[:] = np.nan
+        with open(os.path.join(directory, 'meta.json'), 'w') as f:
+            json.dump(dict(meta, names=list(names), outputs=OUTPUT_NAMES, points=n, created=time.time()), f, indent=2)
+        return cls(directory)
+
+    def pending(self):
+        return np.flatnonzero(self.status == PENDING)
+
+    def set_result(self, i, result, elapsed_s=np.nan):
+        cH2S_ppm, cNH3_ppm, temperatures = result
+        self.outputs[i] = [cH2S_ppm, cNH3_ppm, *temperatures]
+        self.elapsed_s[i] = elapsed_s
+        self.status[i] = DONE
+
+    def set_failed(self, i, elapsed_s=np.nan):
+        self.elapsed_s[i] = elapsed_s
+        self.status[i] = FAILED
+
+    # Results are flushed before the status, so a point is only marked done on disk
+    # once its outputs are there
+    def flush(self):
+        self.outputs.flush()
+        self.elapsed_s.flush()
+        self.status.flush()
+
+    def summary(self):
+        done = self.status == DONE
+        h2s, nh3 = self.outputs[:, 0], self.outputs[:, 1]
+        feasible = done & (h2s <= LIMITS[0]) & (nh3 <= LIMITS[1])
+        solved = done & np.isfinite(self.elapsed_s)
+        solve_time = f"{np.median(self.elapsed_s[solved]):.3f} s" if solved.any() else 'n/a'
+        return (f"DOE sweep ({self.meta['design']}, {len(self.design)} points): {int(done.sum())} done, "
+                f"{int((self.status == FAILED).sum())} failed, {len(self.pending())} pending; "
+                f"{int(feasible.sum())} feasible; median solve time per point {solve_time}")
+
+
+# Evaluate the pending points of a sweep on a simulator pool. At most two runs per
+# worker are queued at a time, and each result is written to the sweep as soon as
+# it arrives (flushed every `flush_every` results), so an interrupted sweep loses
+# at most the runs in flight. Points already in the result store are filled in
+# without simulating, and new results are added to it. Failed runs are marked as
+# such and not retried.
+# With order='nearest' the pending points are instead chained by nearest neighbour
+# in the unit box (starting next to the archive point) and handed out as chains of
+# `chain_length` points, each run back to back on one instance so that every solve
+# warm starts from a nearby converged state; a jump longer than `max_jump` (unit
+# box distance) reloads the archive first.
+def run_sweep(sweep, pool, store=None, flush_every=10, progress=None, order='design', chain_length=16, max_jump=None):
+    pending = list(sweep.pending())
+    if store is not None:
+        remaining = []
+        for i in pending:
+            result = store.get(sweep.design[i])
+            if result is None:
+                remaining.append(i)
+            else:
+                sweep.set_result(i, result)
+        pending = remaining
+        sweep.flush()
+    pending.reverse()
+    running = {}
+    unflushed = 0
+    if order == 'nearest' and pending:
+        bounds = sweep.meta['bounds']
+        archive = unit_scale(VARIANTS[len(sweep.names)][1], bounds)[0]
+        reload_if = None if max_jump is None else JumpLimit(sweep.names, bounds, max_jump)
+        for chain in schedule_chains(unit_scale(sweep.design[pending], bounds), chain_length, start=archive):
+            indices = [pending[j] for j in chain]
+            futures = pool.submit_chain([dict(zip(sweep.names, sweep.design[i])) for i in indices], reload_if)
+            running.update(zip(futures, indices))
+        pending = []
+    try:
+        while pending or running:
+            while pending and len(running) < 2 * pool.size:
+                i = pending.pop()
+                running[pool.submit(dict(zip(sweep.names, sweep.design[i])))] = i
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                i = running.pop(future)
+                elapsed_s = getattr(future, 'elapsed_s', np.nan)
+                if future.exception() is None:
+                    sweep.set_result(i, future.result(), elapsed_s)
+                    if store is not None:
+                        store.put(sweep.design[i], future.result())
+                else:
+                    sweep.set_failed(i, elapsed_s)
+                unflushed += 1
+                if progress is not None:
+                    progress(i, future)
+            if unflushed >= flush_every:
+                sweep.flush()
+                unflushed = 0
+    finally:
+        for future in running:
+            future.cancel()
+        sweep.flush()
+    return sweep
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Evaluate a design of experiments over the flowsheet inputs')
+    parser.add_argument('directory', help='sweep directory; an existing sweep there is resumed')
+    parser.add_argument('--design', choices=DESIGNS, default='lhs')
+    parser.add_argument('--points', type=int, default=256, help='design points (lhs, sobol)')
+    parser.add_argument('--levels', type=int, nargs='+', default=[5], help='levels per input (factorial)')
+    parser.add_argument('--variables', type=int, default=4, choices=sorted(VARIANTS))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--model', default=DEFAULT_MODEL_FILE)
+    parser.add_argument('--workers', type=int, default=2, help='simulator instances')
+    parser.add_argument('--backend', default=backend_kind(), choices=['standin', 'aspen'])
+    parser.add_argument('--no-store', action='store_true', help='do not read or add to the result store')
+    parser.add_argument('--order', choices=['design', 'nearest'], default='nearest',
+                        help='evaluation order: design order, or nearest-neighbour chains per instance')
+    parser.add_argument('--chain-length', type=int, default=16)
+    parser.add_argument('--max-jump', type=float, help='reload the archive before a longer jump (unit-box distance)')
+    args = parser.parse_args(argv)
+
+    model_path = os.path.abspath(args.model)
+    names, _, _, bounds = VARIANTS[args.variables]
+    if os.path.exists(os.path.join(args.directory, 'meta.json')):
+        sweep = Sweep(args.directory)
+        print(f"Resuming {args.directory}: {len(sweep.pending())} of {len(sweep.design)} points pending")
+    else:
+        design = make_design(args.design, bounds, args.points, args.levels, args.seed)
+        sweep = Sweep.create(args.directory, names, design, design=args.design, seed=args.seed,
+                             levels=args.levels, bounds=bounds, model=model_path, backend=args.backend)
+    store = None if args.no_store else ResultStore(sweep.meta['model'], backend=sweep.meta['backend'])
+
+    def progress(i, future):
+        status = 'failed' if future.exception() is not None else 'done'
+        print(f"Point {i}: {status}", file=sys.stderr)
+
+    timer = PhaseTimer()
+    with SimulatorPool(partial(make_backend, sweep.meta['model'], sweep.meta['backend']), size=args.workers, timer=timer) as pool:
+        run_sweep(sweep, pool, store, progress=progress, order=args.order, chain_length=args.chain_length, max_jump=args.max_jump)
+    print(sweep.summary())
+    # Per-point Run2 ('run') and archive reload times
+    print(f"Archive reloads: {pool.reloads}")
+    print(timer.summary())
+    if store is not None:
+        print(store.summary())
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
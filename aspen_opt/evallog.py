@@ -0,0 +1,99 @@
+import json
+import queue
+import threading
+import time
+
+_STOP = object()
+
+
+# NumPy scalars and arrays are written as plain numbers and lists
+def _plain(value):
+    return value.tolist() if hasattr(value, 'tolist') else float(value)
+
+
+# Buffered, structured evaluation log. record() only queues the record; a
+# background thread writes queued records in batches as JSON lines to `path`
+# (and their `text`, if any, to the plain-text `text_path` log). Console output is
+# optional: records marked `always` are printed, the others at most once every
+# `console_interval` seconds, with a count of the skipped lines.
+class EvaluationLog:
+    def __init__(self, path, text_path=None, console=True, console_interval=1.0, batch_size=256, flush_interval=1.0):
+        self.path = path
+        self.console = console
+        self.console_interval = console_interval
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._file = open(path, 'w')
+        self._text_file = open(text_path, 'w') if text_path is not None else None
+        self._last_print = -float('inf')
+        self._suppressed = 0
+        self._console_lock = threading.Lock()
+        self._writer = threading.Thread(target=self._write_loop, name='evaluation-log', daemon=True)
+        self._writer.start()
+
+    def record(self, event, text=None, always=False, **fields):
+        record = {'time': time.time(), 'event': event}
+        if text is not None:
+            record['text'] = text
+        record.update(fields)
+        self._queue.put(record)
+        if text is not None and self.console:
+            self._print(text, always)
+
+    def _print(self, text, always):
+        with self._console_lock:
+            now = time.monotonic()
+            if not always and now - self._last_print < self.console_interval:
+                self._suppressed += 1
+                return
+            if self._suppressed:
+                print(f"... {self._suppressed} log lines not shown")
+                self._suppressed = 0
+            self._last_print = now
+            print(text)
+
+    def _write_batch(self, batch):
+        self._file.write(''.join(json.dumps(record, default=_plain) + '\n' for record in batch))
+        self._file.flush()
+        if self._text_file is not None:
+            self._text_file.write(''.join(record['text'] + '\n' for record in batch if 'text' in record))
+            self._text_file.flush()
+
+    def _write_loop(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                break
+            if item is not None:
+                batch.append(item)
+            if batch and (len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                self._write_batch(batch)
+                batch = []
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flush_interval
+        if batch:
+            self._write_batch(batch)
+
+    # Flush everything queued so far and stop the writer
+    def close(self):
+        if self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join()
+        self._file.close()
+        if self._text_file is not None:
+            self._text_file.close()
+
+
+# Records of a structured log, optionally only those of one event type
+def load_log(path, event=None):
+    with open(path) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    if event is not None:
+        records = [record for record in records if record['event'] == event]
+    return records
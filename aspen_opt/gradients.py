@@ -0,0 +1,93 @@
+import numpy as np
+
+EPS = np.finfo(float).eps
+
+
+# Number of points in one finite-difference batch (the point plus its perturbations),
+# i.e. the pool size that solves a whole gradient in a single round
+def fd_batch_size(n, scheme='forward'):
+    return 1 + n * (2 if scheme == 'central' else 1)
+
+
+# Finite-difference derivatives whose perturbed points are simulated as one batch.
+# `simulate_batch(points_scaled)` must simulate every point not yet cached (e.g.
+# across a SimulatorPool) so that the functions differentiated afterwards (cost,
+# penalty, constraints) only read cached results: each point is simulated once
+# and shared by the cost and constraint Jacobians.
+class ParallelJacobian:
+    def __init__(self, simulate_batch, scheme='forward', rel_step=None, bounds=None):
+        if scheme not in ('forward', 'central'):
+            raise ValueError(f"Unknown finite-difference scheme: {scheme}")
+        self.simulate_batch = simulate_batch
+        self.scheme = scheme
+        if rel_step is None:
+            rel_step = EPS ** 0.5 if scheme == 'forward' else EPS ** (1 / 3)
+        self.rel_step = rel_step
+        self.bounds = bounds
+
+    # Signed steps per variable: (h,) for forward differences and (h, -h) for central
+    # ones. Steps that would leave the bounds are flipped (forward) or fall back to
+    # a one-sided step inside the box (central), as SciPy does.
+    def _steps(self, x):
+        h = self.rel_step * np.maximum(1.0, np.abs(x))
+        lb = np.full(len(x), -np.inf)
+        ub = np.full(len(x), np.inf)
+        if self.bounds is not None:
+            lb = np.array([-np.inf if low is None else low for low, _ in self.bounds], dtype=float)
+            ub = np.array([np.inf if high is None else high for _, high in self.bounds], dtype=float)
+        steps = []
+        for i in range(len(x)):
+            fits_up = x[i] + h[i] <= ub[i]
+            fits_down = x[i] - h[i] >= lb[i]
+            if self.scheme == 'central' and fits_up and fits_down:
+                steps.append((h[i], -h[i]))
+            else:
+                steps.append((h[i],) if fits_up or not fits_down else (-h[i],))
+        return steps
+
+    def _points(self, x, steps):
+        points = [x]
+        for i, offsets in enumerate(steps):
+            for offset in offsets:
+                point = x.copy()
+                point[i] += offset
+                points.append(point)
+        return points
+
+    def _derivatives(self, fun, x, steps):
+        f0 = np.atleast_1d(np.asarray(fun(x), dtype=float))
+        columns = []
+        for i, offsets in enumerate(steps):
+            values = []
+            for offset in offsets:
+                point = x.copy()
+                point[i] += offset
+                values.append(np.atleast_1d(np.asarray(fun(point), dtype=float)))
+            if len(offsets) == 2:
+                columns.append((values[0] - values[1]) / (offsets[0] - offsets[1]))
+            else:
+                columns.append((values[0] - f0) / offsets[0])
+        return f0, np.column_stack(columns)
+
+    # Simulate x and all its perturbations in one batch, then difference `fun`
+    def _evaluate(self, fun, x):
+        x = np.asarray(x, dtype=float)
+        steps = self._steps(x)
+        self.simulate_batch(self._points(x, steps))
+        return self._derivatives(fun, x, steps)
+
+    # `jac` callable for minimize() or a constraint dict; scalar functions get a gradient vector
+    def jacobian(self, fun):
+        def jac(x):
+            f0, J = self._evaluate(fun, x)
+            return J[0] if len(f0) == 1 else J
+        return jac
+
+    # Objective returning (value, gradient) for minimize(..., jac=True): the point
+    # and its perturbations are simulated together, so a gradient costs about one
+    # simulation of wall time on a pool with n + 1 (forward) or 2n + 1 (central) instances
+    def value_and_grad(self, fun):
+        def fun_and_grad(x):
+            f0, J = self._evaluate(fun, x)
+            return f0[0], J[0]
+        return fun_and_grad
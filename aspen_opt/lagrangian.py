@@ -0,0 +1,114 @@
+import argparse
+import os
+import tempfile
+
+import numpy as np
+from scipy.optimize import OptimizeResult, minimize
+
+
+# Augmented-Lagrangian method for min cost(x) subject to outputs(x) <= upper inside
+# box bounds. Each outer iteration minimizes, with L-BFGS-B on the bounds,
+#   L(x) = cost(x) / f_scale + 1 / (2 rho) * sum(max(0, lam + rho c(x))^2 - lam^2)
+# with c(x) = (outputs(x) - upper) / upper the relative violations; then the
+# multipliers are updated, lam = max(0, lam + rho c(x)), and rho is multiplied by
+# `rho_growth` when the violation has not dropped below `contraction` times its
+# previous value. Unlike a fixed 1e6 penalty, the inner problems stay well scaled
+# and the multipliers carry the constraint information from one outer iteration
+# to the next. `cost_gradient(x)` is exact; `outputs_jacobian(x)` (finite
+# differences of the simulated outputs) is only called where some constraint is
+# active in L. The simulations behind `outputs` are cached by the caller, so the
+# inner solves reuse each other's points. Stops once the violation is below
+# `feas_tol` and the cost changed by less than `ftol` (relative) over an outer
+# iteration, or after `max_outer` outer iterations (`maxiter`, the option every
+# method of the scripts takes, sets the same limit). The result has the fields the
+# scripts report (x, fun, nfev, nit, maxcv, success, message), with nfev counting
+# inner L-BFGS-B evaluations.
+def augmented_lagrangian_minimize(cost, cost_gradient, outputs, outputs_jacobian, x0, bounds, upper, rho=10.0,
+                                  rho_growth=10.0, max_rho=1e8, contraction=0.25, max_outer=20, inner_maxiter=200,
+                                  ftol=1e-6, feas_tol=1e-4, maxiter=None):
+    max_outer = max_outer if maxiter is None else maxiter
+    upper = np.asarray(upper, dtype=float)
+    f_scale = max(abs(cost(np.asarray(x0, dtype=float))), 1.0)
+    lam = np.zeros(len(upper))
+    x = np.asarray(x0, dtype=float)
+    nfev = 0
+
+    def violations(y):
+        return (np.asarray(y, dtype=float) - upper) / upper
+
+    def lagrangian(x):
+        nonlocal nfev
+        nfev += 1
+        c = violations(outputs(x))
+        shifted = np.maximum(0.0, lam + rho * c)
+        value = cost(x) / f_scale + float(np.sum(shifted ** 2 - lam ** 2)) / (2 * rho)
+        gradient = np.asarray(cost_gradient(x), dtype=float) / f_scale
+        if np.any(shifted > 0):
+            gradient = gradient + (shifted / upper) @ np.atleast_2d(outputs_jacobian(x))
+        return value, gradient
+
+    previous_violation = np.inf
+    previous_cost = cost(x)
+    # State of x0, returned as is when max_outer is 0
+    nit = 0
+    violation = float(np.max(np.maximum(violations(outputs(x)), 0.0)))
+    message = 'Maximum number of outer iterations reached'
+    for nit in range(1, max_outer + 1):
+        inner = minimize(lagrangian, x, method='L-BFGS-B', jac=True, bounds=bounds,
+                         options={'maxiter': inner_maxiter})
+        x = inner.x
+        c = violations(outputs(x))
+        violation = float(np.max(np.maximum(c, 0.0)))
+        lam = np.maximum(0.0, lam + rho * c)
+        current_cost = cost(x)
+        if violation <= feas_tol and abs(current_cost - previous_cost) <= ftol * f_scale:
+            message = 'Feasible and the cost changed by less than ftol'
+            break
+        if violation > contraction * previous_violation:
+            if rho >= max_rho:
+                message = 'Penalty weight reached max_rho'
+                break
+            rho = min(rho * rho_growth, max_rho)
+        previous_violation = violation
+        previous_cost = current_cost
+    maxcv = float(np.max(np.maximum(np.asarray(outputs(x), dtype=float) - upper, 0.0)))
+    return OptimizeResult(x=x, fun=cost(x), nfev=nfev, nit=nit, maxcv=maxcv, multipliers=lam, rho=rho,
+                          success=violation <= feas_tol, message=message)
+
+
+# Run the fixed-penalty L-BFGS-B and the augmented-Lagrangian method from the same
+# x0, each with its own empty result store, and report the simulations each needed
+# to reach its own feasible optimum and the best feasible cost of the two
+def compare(model_path, variables=4, output_dir='.', backend=None):
+    from aspen_opt.optimizer import OptimizationRun
+
+    runs = []
+    with tempfile.TemporaryDirectory() as store_dir:
+        for method in ['L-BFGS-B', 'augmented-lagrangian']:
+            run = OptimizationRun(model_path, variables, method, output_dir=output_dir, backend=backend,
+                                  store_path=os.path.join(store_dir, method + '.sqlite'))
+            runs.append((method, run, run.run()))
+    # Best feasible cost (violation at most 1e-4 ppm) reached by either method, the common target
+    best = min((result.fun for _, run, result in runs if run.max_violation(result.x) <= 1e-4), default=None)
+    lines = [f"{'method':<22} {'cost':>14} {'max viol (ppm)':>15} {'simulations':>12} {'to own optimum':>15} "
+             f"{'to best':>8}"]
+    for method, run, result in runs:
+        to_optimum = run.simulations_to_optimum(result.fun)
+        to_best = None if best is None else run.simulations_to_optimum(best)
+        lines.append(f"{method:<22} {result.fun:>14.1f} {run.max_violation(result.x):>15.3g} {run.simulations:>12} "
+                     f"{'-' if to_optimum is None else to_optimum:>15} {'-' if to_best is None else to_best:>8}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare the augmented-Lagrangian method with the fixed 1e6 penalty')
+    parser.add_argument('--model', default='UTAA_revK.bkp')
+    parser.add_argument('--variables', type=int, default=4, choices=[3, 4])
+    parser.add_argument('--output-dir', default='.')
+    parser.add_argument('--backend', choices=['standin', 'aspen'])
+    args = parser.parse_args(argv)
+    print(compare(args.model, args.variables, args.output_dir, args.backend))
+
+
+if __name__ == '__main__':
+    main()
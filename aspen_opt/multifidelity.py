@@ -0,0 +1,216 @@
+import argparse
+import os
+import tempfile
+from functools import partial
+
+import numpy as np
+from scipy.interpolate import RBFInterpolator
+from scipy.optimize import OptimizeResult, minimize
+
+from aspen_opt.backends import backend_kind, is_failed, make_backend
+from aspen_opt.pool import SimulatorPool
+from aspen_opt.problem import PROBLEMS
+from aspen_opt.simulator import SharedSimulator
+from aspen_opt.store import DEFAULT_STORE_PATH, ResultStore
+from aspen_opt.surrogate import _better
+
+HIGH_MODEL_FILE = 'UTAA_revK.bkp'
+LOW_MODEL_FILE = 'UTAA_revK_SM.bkp'
+
+
+# Correction from the cheap model to the full one: log(y_high / y_low) of each
+# limited output, interpolated through the paired evaluations with a linear RBF
+# (plus a linear trend once there are n + 1 pairs, a constant before). The
+# corrected cheap model matches the full model exactly at every confirmed point,
+# so the correction is most accurate where the optimizer has been. Before the
+# first pair (e.g. every confirmation so far failed) the correction is zero.
+class LogCorrection:
+    def __init__(self, n, smoothing=1e-8):
+        self.n = n
+        self.smoothing = smoothing
+        self.points = []
+        self.ratios = []
+        self.model = None
+
+    def add(self, u, y_high, y_low):
+        u = np.asarray(u, dtype=float)
+        if any(np.array_equal(u, point) for point in self.points):
+            return
+        self.points.append(u)
+        self.ratios.append(np.log(np.asarray(y_high, dtype=float) / np.asarray(y_low, dtype=float)))
+        points, ratios = np.array(self.points), np.array(self.ratios)
+        try:
+            degree = 1 if len(self.points) > self.n else 0
+            self.model = RBFInterpolator(points, ratios, kernel='linear', degree=degree, smoothing=self.smoothing)
+        except np.linalg.LinAlgError:
+            # The pairs lie on a hyperplane (e.g. an input held at a bound): no linear trend
+            self.model = RBFInterpolator(points, ratios, kernel='linear', degree=0, smoothing=self.smoothing)
+
+    def __call__(self, u):
+        if self.model is None:
+            return 0.0
+        return self.model(np.atleast_2d(u))[0]
+
+
+# Multi-fidelity trust-region optimization. `high` and `low` map non-scaled inputs
+# to a simulation result (cH2S_ppm, cNH3_ppm, temperatures) on the full and the
+# cheap flowsheet (e.g. SharedSimulator, which caches them). Each iteration
+# minimizes the plant cost with COBYLA against the cheap model corrected by
+# LogCorrection, inside a box of half-width `radius` (unit box; the whole box at
+# first) around the current centre; only that candidate is confirmed on the full
+# model. A candidate that beats the centre (feasible first, then cost) becomes the
+# centre and a full step grows the radius, otherwise the radius is halved; every
+# confirmed candidate adds a pair to the correction. Stops when the candidate
+# stays at the centre, the radius falls below `min_radius`, an accepted step
+# improves the cost by less than `ftol` (relative), or after `max_high` full-model
+# solves. Failed simulations count as infinitely infeasible and are not paired.
+def multifidelity_minimize(high, low, problem, radius=1.0, min_radius=1e-3, max_radius=1.0, max_high=60,
+                           low_maxiter=200, ftol=1e-5, feas_tol=1e-6):
+    lower, upper = np.array(problem.bounds_unscaled, dtype=float).T
+    span = upper - lower
+    n = len(problem)
+    limits = problem.upper
+    correction = LogCorrection(n)
+    high_solves = 0
+
+    def from_unit(u):
+        return list(lower + np.asarray(u, dtype=float) * span)
+
+    def cost(u):
+        return float(np.dot(problem.cost_weights, from_unit(u)))
+
+    # Limited outputs at `u`, or None for a failed simulation (reported as a finite
+    # failure_ppm by SharedSimulator, so it is told apart by is_failed)
+    def outputs(simulator, u):
+        result = simulator(from_unit(u))
+        y = problem.outputs(result)
+        return None if is_failed(result) or not np.all(np.isfinite(y)) or not np.all(y > 0) else y
+
+    def violation(y):
+        return np.inf if y is None else float(np.max(np.maximum(y - limits, 0.0)))
+
+    # Confirm a point on the full model and pair it with the cheap one
+    def confirm(u):
+        nonlocal high_solves
+        high_solves += 1
+        y_high = outputs(high, u)
+        y_low = outputs(low, u)
+        if y_high is not None and y_low is not None:
+            correction.add(u, y_high, y_low)
+        return y_high
+
+    centre = (np.asarray(problem.x0, dtype=float) - lower) / span
+    centre_y = confirm(centre)
+    centre_cost, centre_violation = cost(centre), violation(centre_y)
+    message = 'Maximum number of full-model solves reached'
+    nit = 0
+    while high_solves < max_high:
+        nit += 1
+        box = [(max(0.0, c - radius), min(1.0, c + radius)) for c in centre]
+
+        # Corrected cheap model: limit - y_low * exp(correction) >= 0, in log form
+        def corrected_margin(u):
+            y_low = outputs(low, u)
+            if y_low is None:
+                return -np.ones(len(limits))
+            return np.log(limits) - (np.log(y_low) + correction(u))
+
+        inner = minimize(cost, np.clip(centre, *np.array(box).T), method='COBYLA', bounds=box,
+                         constraints={'type': 'ineq', 'fun': corrected_margin},
+                         options={'maxiter': low_maxiter, 'rhobeg': radius / 2, 'tol': min_radius / 10})
+        candidate = np.clip(inner.x, 0.0, 1.0)
+        if np.max(np.abs(candidate - centre)) < min_radius:
+            message = 'The corrected cheap model predicts no better point'
+            break
+        candidate_y = confirm(candidate)
+        candidate_cost, candidate_violation = cost(candidate), violation(candidate_y)
+        if _better(candidate_cost, candidate_violation, centre_cost, centre_violation, feas_tol):
+            improvement = (centre_cost - candidate_cost) / abs(centre_cost)
+            step = np.max(np.abs(candidate - centre))
+            feasible_before = centre_violation <= feas_tol
+            centre, centre_y, centre_cost, centre_violation = candidate, candidate_y, candidate_cost, candidate_violation
+            if step >= 0.9 * radius:
+                radius = min(2 * radius, max_radius)
+            if feasible_before and 0 <= improvement < ftol:
+                message = 'The cost improved by less than ftol'
+                break
+        else:
+            radius /= 2
+            if radius < min_radius:
+                message = 'Trust region radius below min_radius'
+                break
+    return OptimizeResult(x=np.array(from_unit(centre)), fun=centre_cost, maxcv=centre_violation, nit=nit,
+                          nfev=high_solves, success=centre_violation <= feas_tol,
+                          message=message)
+
+
+# Run the multi-fidelity driver on pools of `workers` instances of each model, with
+# the result store at `store_path` (None for no store); returns the result and the
+# full- and cheap-model simulators (their solve counts)
+def optimize(variables=3, backend=None, workers=1, store_path=DEFAULT_STORE_PATH):
+    problem = PROBLEMS[variables]
+    backend = backend or backend_kind()
+    paths = [os.path.abspath(path) for path in (HIGH_MODEL_FILE, LOW_MODEL_FILE)]
+    stores = [None, None] if store_path is None else [ResultStore(path, path=store_path, backend=backend) for path in paths]
+    try:
+        with SimulatorPool(partial(make_backend, paths[0], backend), size=workers) as high_pool, \
+                SimulatorPool(partial(make_backend, paths[1], backend), size=workers) as low_pool:
+            high = SharedSimulator(high_pool, problem.names, stores[0])
+            low = SharedSimulator(low_pool, problem.names, stores[1])
+            result = multifidelity_minimize(high, low, problem)
+    finally:
+        for store in stores:
+            if store is not None:
+                store.close()
+    return result, high, low
+
+
+def describe(result, high, low):
+    return (f"Multi-fidelity: cost {result.fun:.1f} (max violation {result.maxcv:.3g} ppm) at "
+            f"{[round(float(v), 4) for v in result.x]}; {high.simulations} full-model and {low.simulations} "
+            f"cheap-model solves; {result.message}")
+
+
+# Optimize with COBYLA on the full model alone and with the multi-fidelity driver,
+# each on empty result stores, and report the full-model solves saved
+def compare(variables=3, backend=None, workers=1, output_dir='.'):
+    from aspen_opt.optimizer import OptimizationRun
+
+    backend = backend or backend_kind()
+    with tempfile.TemporaryDirectory() as store_dir:
+        run = OptimizationRun(HIGH_MODEL_FILE, variables, 'COBYLA', name='multifidelity_reference', output_dir=output_dir,
+                              backend=backend, store_path=os.path.join(store_dir, 'reference.sqlite'))
+        reference = run.run()
+        reference_solves = run.simulations
+        result, high, low = optimize(variables, backend, workers, os.path.join(store_dir, 'multifidelity.sqlite'))
+    saved = reference_solves - high.simulations
+    lines = [
+        f"Full model only (COBYLA): cost {reference.fun:.1f}, {reference_solves} full-model solves",
+        describe(result, high, low),
+        f"Full-model solves saved: {saved} ({100 * saved / max(reference_solves, 1):.0f}%)",
+    ]
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=f'Multi-fidelity optimization: explore on {LOW_MODEL_FILE}, '
+                                                 f'confirm on {HIGH_MODEL_FILE}')
+    # The simplified model only has 3-variable runs (SF stays at its archive value)
+    parser.add_argument('--variables', type=int, default=3, choices=[3])
+    parser.add_argument('--workers', type=int, default=1, help='simulator instances per model')
+    parser.add_argument('--backend', default=backend_kind(), choices=['standin', 'aspen'])
+    parser.add_argument('--no-store', action='store_true', help='do not read or add to the result store')
+    parser.add_argument('--compare', action='store_true',
+                        help='first run COBYLA on the full model alone, on empty stores, and report the solves saved')
+    parser.add_argument('--output-dir', default='.', help='log directory of the --compare reference run')
+    args = parser.parse_args(argv)
+    if args.compare:
+        print(compare(args.variables, args.backend, args.workers, args.output_dir))
+        return
+    result, high, low = optimize(args.variables, args.backend, args.workers, None if args.no_store else DEFAULT_STORE_PATH)
+    print(describe(result, high, low))
+    return result
+
+
+if __name__ == '__main__':
+    main()
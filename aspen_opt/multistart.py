@@ -0,0 +1,208 @@
+import argparse
+import os
+import sys
+import threading
+import time
+from functools import partial
+
+import numpy as np
+
+from aspen_opt.backends import backend_kind, make_backend
+from aspen_opt.benchmark import DEFAULT_MODEL_FILE, METHODS, MODEL_FILES, VARIANTS, solve, starting_points
+from aspen_opt.gradients import ParallelJacobian
+from aspen_opt.pool import SimulatorPool
+from aspen_opt.problem import PROBLEMS
+from aspen_opt.scheduling import unit_scale
+from aspen_opt.simulator import SharedSimulator
+from aspen_opt.store import ResultStore
+
+
+# Raised inside the objective of a start the driver has stopped
+class StartStopped(Exception):
+    pass
+
+
+# Progress of every start, used to stop dominated ones. After `warmup` evaluations
+# a start is stopped when
+#  - its current point is within `merge_radius` (unit box) of another start's
+#    current point and that start has a lower cost (both head for the same
+#    optimum), or
+#  - it has not improved its best feasible cost for `patience` evaluations and that
+#    cost (infinite while it has found no feasible point) is more than `margin`
+#    (relative) above the best feasible cost found by any start.
+# All starts are stopped once `budget` simulations have been run.
+class StartTracker:
+    def __init__(self, starts, bounds, warmup=10, patience=20, merge_radius=0.05, margin=0.02, budget=None):
+        self.bounds = bounds
+        self.warmup = warmup
+        self.patience = patience
+        self.merge_radius = merge_radius
+        self.margin = margin
+        self.budget = budget
+        self.evaluations = [0] * starts
+        self.best = [np.inf] * starts
+        self.last_improvement = [0] * starts
+        self.current = [None] * starts
+        self.current_cost = [np.inf] * starts
+        self.stopped = [None] * starts
+        self._lock = threading.Lock()
+
+    def _reason(self, i, simulations):
+        if self.budget is not None and simulations >= self.budget:
+            return 'budget'
+        if self.evaluations[i] < self.warmup:
+            return None
+        for j in range(len(self.current)):
+            if j == i or self.current[j] is None or self.stopped[j] not in (None, 'finished'):
+                continue
+            close = np.linalg.norm(self.current[i] - self.current[j]) < self.merge_radius
+            if close and self.current_cost[j] < self.current_cost[i]:
+                return f'merged with start {j}'
+        incumbent = min(self.best)
+        stalled = self.evaluations[i] - self.last_improvement[i] >= self.patience
+        if stalled and self.best[i] > incumbent * (1 + self.margin):
+            return 'dominated'
+        return None
+
+    # Record an evaluation of start `i`; raises StartStopped when it should stop
+    def update(self, i, x, cost, violation, simulations):
+        with self._lock:
+            self.evaluations[i] += 1
+            self.current[i] = unit_scale(x, self.bounds)[0]
+            self.current_cost[i] = cost if violation <= 0 else cost * (1 + violation)
+            if violation <= 0 and cost < self.best[i]:
+                self.best[i] = cost
+                self.last_improvement[i] = self.evaluations[i]
+            if self.stopped[i] is None:
+                self.stopped[i] = self._reason(i, simulations)
+            if self.stopped[i] is not None:
+                raise StartStopped(self.stopped[i])
+
+    # A start that returned normally no longer blocks the others
+    def finish(self, i):
+        with self._lock:
+            self.stopped[i] = self.stopped[i] or 'finished'
+
+
+# Run one start with `method`, reporting every evaluation to the tracker
+def run_start(index, method, variables, x0, simulator, tracker):
+    problem = PROBLEMS[variables]
+    best = {'cost': np.inf, 'x': None, 'violation': np.inf}
+
+    def simulate(x_scaled):
+        x = problem.unscale(x_scaled)
+        result = simulator(x)
+        violation = float(np.max(problem.violations(result)))
+        cost = problem.cost(x_scaled)
+        if violation < best['violation'] or (violation <= 0 and cost < best['cost']):
+            best.update(cost=cost, x=x, violation=violation)
+        tracker.update(index, x, cost, violation, simulator.simulations)
+        return result
+
+    def outputs(x_scaled):
+        return problem.outputs(simulate(x_scaled))
+
+    # Finite-difference batches are simulated together, then each point is reported
+    def simulate_batch(points_scaled):
+        simulator.simulate_batch([problem.unscale(x_scaled) for x_scaled in points_scaled])
+        return [simulate(x_scaled) for x_scaled in points_scaled]
+
+    jacobian = ParallelJacobian(simulate_batch, bounds=problem.bounds_scaled)
+    try:
+        result = solve(method, problem, outputs, problem.scale(x0), jacobian)
+        status = 'converged' if result.success else 'finished: ' + str(result.message).strip()
+        tracker.finish(index)
+    except StartStopped as e:
+        status = 'stopped: ' + str(e)
+    return {
+        'start': index,
+        'x0': [float(v) for v in x0],
+        'x': [float(v) for v in best['x']] if best['x'] is not None else None,
+        'cost': float(best['cost']) if best['violation'] <= 0 else None,
+        'max_violation': float(best['violation']),
+        'evaluations': tracker.evaluations[index],
+        'status': status,
+    }
+
+
+# Run `starts` starts (the scripts' x0 plus a Latin hypercube over the bounds)
+# concurrently, one thread each, on a shared simulator. Returns the per-start rows
+# and the totals.
+def multistart(method, variables, simulator, starts=8, seed=0, **tracker_options):
+    _, _, _, bounds = VARIANTS[variables]
+    points = starting_points(variables, starts, seed)
+    tracker = StartTracker(len(points), bounds, **tracker_options)
+    rows = [None] * len(points)
+
+    def worker(i, x0):
+        rows[i] = run_start(i, method, variables, x0, simulator, tracker)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i, x0), name=f"start-{i}") for i, x0 in enumerate(points)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    totals = {'wall_time_s': time.perf_counter() - start, 'simulations': simulator.simulations,
+              'requests': simulator.requests, 'evaluations': sum(row['evaluations'] for row in rows)}
+    return rows, totals
+
+
+# Best feasible optimum and the spread of the local optima (best feasible points of
+# the starts the optimizer finished, merged when closer than `radius` in the unit box)
+def summarize(rows, totals, bounds, radius=0.02):
+    lines = [f"{'start':>5} {'cost':>14} {'max viol':>10} {'evals':>6}  status"]
+    for row in rows:
+        cost = f"{row['cost']:.1f}" if row['cost'] is not None else '-'
+        lines.append(f"{row['start']:>5} {cost:>14} {row['max_violation']:>10.3g} {row['evaluations']:>6}  {row['status']}")
+    feasible = [row for row in rows if row['cost'] is not None]
+    lines.append(f"Simulations: {totals['simulations']} for {totals['evaluations']} evaluations "
+                 f"({totals['evaluations'] - totals['simulations']} served by the shared cache); "
+                 f"wall time {totals['wall_time_s']:.1f} s")
+    if not feasible:
+        lines.append('No start found a feasible point')
+        return '\n'.join(lines)
+    best = min(feasible, key=lambda row: row['cost'])
+    finished = [row for row in feasible if not row['status'].startswith('stopped')] or [best]
+    costs = np.array([row['cost'] for row in finished])
+    optima = []
+    for row in sorted(finished, key=lambda row: row['cost']):
+        u = unit_scale(row['x'], bounds)[0]
+        if all(np.linalg.norm(u - v) > radius for v in optima):
+            optima.append(u)
+    lines.append(f"Best feasible optimum: {best['cost']:.1f} at {[round(v, 4) for v in best['x']]} (start {best['start']})")
+    lines.append(f"Local optima: {len(optima)} distinct among {len(finished)} finished starts; cost min {costs.min():.1f}, "
+                 f"median {np.median(costs):.1f}, max {costs.max():.1f}, spread {costs.max() - costs.min():.1f}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Multi-start optimization on a shared simulation cache')
+    parser.add_argument('--method', default='COBYLA', choices=METHODS)
+    parser.add_argument('--variables', type=int, default=4, choices=sorted(VARIANTS))
+    parser.add_argument('--starts', type=int, default=8, help='starts (x0 plus a Latin hypercube)')
+    parser.add_argument('--workers', type=int, help='simulator instances (default: one per start)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--budget', type=int, help='stop every start after this many simulations')
+    parser.add_argument('--no-kill', action='store_true', help='let every start run to completion')
+    parser.add_argument('--backend', default=backend_kind(), choices=['standin', 'aspen'])
+    parser.add_argument('--no-store', action='store_true', help='do not read or add to the result store')
+    args = parser.parse_args(argv)
+
+    names, _, _, bounds = VARIANTS[args.variables]
+    model_path = os.path.abspath(MODEL_FILES.get(args.method, DEFAULT_MODEL_FILE))
+    store = None if args.no_store else ResultStore(model_path, backend=args.backend)
+    tracker_options = {'budget': args.budget}
+    if args.no_kill:
+        tracker_options.update(warmup=np.inf)
+    with SimulatorPool(partial(make_backend, model_path, args.backend), size=args.workers or args.starts) as pool:
+        simulator = SharedSimulator(pool, names, store)
+        rows, totals = multistart(args.method, args.variables, simulator, args.starts, args.seed, **tracker_options)
+    print(summarize(rows, totals, bounds))
+    if store is not None:
+        print(store.summary(), file=sys.stderr)
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
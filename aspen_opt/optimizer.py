@@ -0,0 +1,307 @@
+import os
+import time
+from functools import partial
+
+import numpy as np
+from scipy.optimize import BFGS, minimize
+
+from aspen_opt.backends import backend_kind, is_failed, make_backend
+from aspen_opt.checkpoint import Checkpoint
+from aspen_opt.evallog import EvaluationLog
+from aspen_opt.gradients import ParallelJacobian, fd_batch_size
+from aspen_opt.pool import SimulatorPool
+from aspen_opt.problem import PROBLEMS
+from aspen_opt.recorder import TrajectoryRecorder
+from aspen_opt.simulator import SharedSimulator
+from aspen_opt.store import DEFAULT_STORE_PATH, ResultStore
+from aspen_opt.timing import PhaseTimer
+
+METHODS = ['COBYLA', 'SLSQP', 'trust-constr', 'L-BFGS-B', 'augmented-lagrangian', 'surrogate', 'bayesian']
+
+# Optimizer options of each method, as in the original scripts
+METHOD_OPTIONS = {
+    'COBYLA': {'maxiter': 10000, 'tol': 1e-2},
+    'SLSQP': {'ftol': 1e-8},
+    'trust-constr': {'maxiter': 1000, 'xtol': 1e-4},
+    'L-BFGS-B': {'maxiter': 10000, 'ftol': 1e-2},
+    'augmented-lagrangian': {},
+    'surrogate': {},
+    'bayesian': {'q': 4},
+}
+
+# Methods whose gradients are finite differences simulated in parallel
+GRADIENT_METHODS = ('SLSQP', 'trust-constr', 'L-BFGS-B', 'augmented-lagrangian')
+
+# Weight of the squared limit violations in the penalized cost (L-BFGS-B)
+PENALTY_WEIGHT = 1e6
+
+# Decimals of each input in the "Simulating with ..." log lines
+LOG_DECIMALS = {'QN1': 0, 'QN2': 0, 'QC': 2, 'SF': 2}
+
+
+# One optimization run of a Problem (problem.PROBLEMS): QN1, QN2, QC (and SF with 4
+# variables) minimizing QN1 + QN2 + QC subject to the H2S and NH3 limits, handed to
+# SciPy as native bounds and one vector constraint. Every method goes
+# through the same evaluation path, a SharedSimulator: simulation cache, failures
+# kept apart, persistent result store, then a SimulatorPool (one instance per point of a
+# finite-difference batch for the gradient methods). The run writes <name>.log,
+# <name>_evaluations.jsonl, <name>_trajectory.csv, <name>_timing.jsonl,
+# <name>_timing_summary.json and <name>_checkpoint.json to `output_dir`. `limits`
+# replaces the H2S and NH3 limits of the problem, e.g. {'H2S': 0.1}; scaled points
+# within `cache_tol` of each other share one cache entry.
+class OptimizationRun:
+    def __init__(self, model_path, variables=4, method='COBYLA', name=None, output_dir='.', options=None, x0=None,
+                 workers=None, fd_scheme='forward', failure_ppm=1e3, backend=None, store_path=DEFAULT_STORE_PATH, limits=None,
+                 cache_tol=1e-9):
+        if method not in METHODS:
+            raise ValueError(f"Unknown method: {method}")
+        self.model_path = os.path.abspath(model_path)
+        self.method = method
+        self.problem = PROBLEMS[variables].with_limits(limits or {})
+        self.names = self.problem.names
+        self.scale_factors = self.problem.scale_factors
+        self.x0 = list(x0 if x0 is not None else self.problem.x0)
+        self.options = dict(METHOD_OPTIONS[method], **(options or {}))
+        self.failure_ppm = failure_ppm
+        self.name = name or f"optimize_{method}_{os.path.splitext(os.path.basename(model_path))[0]}_{variables}_variables"
+        self.output_dir = output_dir
+        backend = backend or backend_kind()
+
+        self.timer = PhaseTimer(self.output_path('_timing.jsonl'))
+        self.evaluation_log = EvaluationLog(self.output_path('_evaluations.jsonl'), text_path=self.output_path('.log'), console_interval=0.5)
+        self.recorder = TrajectoryRecorder(self.names, self.output_path('_trajectory.csv'))
+        self.store = ResultStore(self.model_path, path=store_path, backend=backend)
+        # (simulations so far, cost, max violation in ppm, wall time in s) after each new
+        # successful simulation
+        self.simulations = 0
+        self.history = []
+        # Set once optimize() returns normally; recorded in the final checkpoint
+        self.completed = False
+
+        if workers is None:
+            workers = fd_batch_size(variables, fd_scheme) if method in GRADIENT_METHODS else 1
+            if method == 'bayesian':
+                workers = self.options['q']
+        print('Connecting to the Aspen Plus... Please wait ')
+        nodes = {'input_nodes': self.problem.input_nodes(), 'output_nodes': self.problem.output_nodes()} if backend == 'aspen' else {}
+        self.pool = SimulatorPool(partial(make_backend, self.model_path, backend, **nodes), size=workers, timer=self.timer)
+        print('Connected!')
+        self.simulator = SharedSimulator(self.pool, self.names, self.store, failure_ppm, unscale=self.unscale,
+                                         on_result=self._record_result, cache_size=4096,
+                                         cache_tol=cache_tol)
+        self.cache = self.simulator.cache
+        self.failures = self.simulator.failures
+
+        self.x0_scaled = self.scale(self.x0)
+        self.bounds_scaled = self.problem.bounds_scaled
+        self.gradient = ParallelJacobian(self.simulate_batch, scheme=fd_scheme, bounds=self.bounds_scaled)
+        self.started = time.perf_counter()
+        self.checkpoint = Checkpoint(self.output_path('_checkpoint.json'), method=method, x0=self.x0_scaled,
+                                     options=self.options, model=self.store.model)
+
+    def output_path(self, suffix):
+        return os.path.join(self.output_dir, self.name + suffix)
+
+    def scale(self, x):
+        return self.problem.scale(x)
+
+    def unscale(self, x_scaled):
+        return self.problem.unscale(x_scaled)
+
+    def log_message(self, message):
+        with self.timer.time('log'):
+            self.evaluation_log.record('message', text=message, always=True)
+
+    def log_simulation(self, x, result, elapsed_s):
+        cH2S_ppm, cNH3_ppm, temperatures = result
+        inputs = dict(zip(self.names, x))
+        values = ', '.join(f"{name}: {round(value, LOG_DECIMALS[name])}" for name, value in inputs.items())
+        if is_failed(result):
+            message = f"Simulation failed with {values}: {result.error}"
+        else:
+            message = f"Simulating with {values} -> H2S: {round(cH2S_ppm,3)}, NH3: {round(cNH3_ppm,3)}"
+        with self.timer.time('log'):
+            self.evaluation_log.record('simulation', text=message, always=is_failed(result), inputs=inputs, H2S_ppm=cH2S_ppm,
+                                       NH3_ppm=cNH3_ppm, temperatures=list(temperatures),
+                                       status='failed' if is_failed(result) else 'ok', elapsed_s=elapsed_s)
+
+    # Simulation results are cached on the scaled input vector, so the cost and every
+    # constraint evaluated at the same point share a single run. Points solved by
+    # earlier runs are loaded from the persistent store, and the remaining ones are
+    # simulated all at once across the pool (see SharedSimulator).
+    def simulate_batch(self, points_scaled):
+        return self.simulator.simulate_batch(points_scaled)
+
+    # Log, count and checkpoint every result new to the cache
+    def _record_result(self, x_scaled, result, elapsed_s):
+        if elapsed_s is not None:
+            self.log_simulation(self.unscale(x_scaled), result, elapsed_s)
+            self.simulations += 1
+            if not is_failed(result):
+                self.history.append((self.simulations, self.problem.cost(x_scaled),
+                                     float(np.max(self.problem.violations(result))),
+                                     time.perf_counter() - self.started))
+        self.checkpoint.add(x_scaled, result)
+
+    def simulate(self, x_scaled, print_temperature=False):
+        cH2S_ppm, cNH3_ppm, temperatures = self.simulate_batch([x_scaled])[0]
+        if print_temperature:
+            T_bottom_N640, T_bottom_N641, T_top_N641 = temperatures
+            self.log_message(f"Temperatures: {T_bottom_N640}, {T_bottom_N641}, {T_top_N641}")
+        return cH2S_ppm, cNH3_ppm
+
+    # Cost of a point without simulating it
+    def plant_cost(self, x_scaled):
+        return self.problem.cost(x_scaled)
+
+    # Objective: the plant cost, recorded with the constraint outputs at the same point
+    def cost(self, x_scaled):
+        with self.timer.time('cost'):
+            total_cost = self.problem.cost(x_scaled)
+            cH2S_ppm, cNH3_ppm = self.simulate(x_scaled)
+            self.recorder.record(self.unscale(x_scaled), total_cost, cH2S_ppm, cNH3_ppm)
+            return total_cost
+
+    # H2S and NH3 ppm at a point, for the vector constraint outputs <= limits
+    def constraints(self, x_scaled):
+        with self.timer.time('constraints'):
+            return self.problem.outputs(self.simulate_batch([x_scaled])[0])
+
+    # Plant cost plus PENALTY_WEIGHT times the squared violations (L-BFGS-B)
+    def cost_with_penalty(self, x_scaled):
+        with self.timer.time('cost_with_penalty'):
+            total_cost = self.problem.cost(x_scaled)
+            result = self.simulate_batch([x_scaled])[0]
+            cH2S_ppm, cNH3_ppm, _ = result
+            total_cost_with_penalty = total_cost + PENALTY_WEIGHT * self.problem.penalty(self.problem.outputs(result))
+            self.recorder.record(self.unscale(x_scaled), total_cost_with_penalty, cH2S_ppm, cNH3_ppm)
+            return total_cost_with_penalty
+
+    # Objective and gradient for the constrained methods: the plant cost is linear, so
+    # its gradient is exact and costs no simulation (the point itself is simulated
+    # for the trajectory, as SciPy evaluates the constraints there anyway)
+    def cost_and_gradient(self, x_scaled):
+        return self.cost(x_scaled), self.problem.cost_gradient()
+
+    # Penalized cost and gradient (L-BFGS-B): exact for the plant cost, and finite
+    # differences of the simulated outputs only at points that exceed a limit. At a
+    # feasible point the penalty and its gradient are zero, so no perturbed point
+    # is simulated.
+    def penalized_cost_and_gradient(self, x_scaled):
+        value = self.cost_with_penalty(x_scaled)
+        gradient = self.problem.cost_gradient()
+        y = self.problem.outputs(self.simulate_batch([x_scaled])[0])
+        if self.problem.penalty(y) > 0:
+            gradient = gradient + PENALTY_WEIGHT * self.problem.penalty_gradient(y, self.gradient.jacobian(self.constraints)(x_scaled))
+        return value, gradient
+
+    # True simulations requested by the surrogate engine, recorded like the iterates
+    # of the other methods; failed simulations are reported as None. The points are
+    # simulated together, across the pool.
+    def simulate_and_record(self, points_scaled):
+        self.simulate_batch(points_scaled)
+        results = []
+        for x_scaled in points_scaled:
+            self.cost(x_scaled)
+            results.append(None if x_scaled in self.failures else self.simulate(x_scaled))
+        return results
+
+    # Largest limit violation (ppm) at a point
+    def max_violation(self, x_scaled):
+        return float(np.max(self.problem.violations(self.simulate_batch([x_scaled])[0])))
+
+    # Simulations run until the first feasible point (violation at most `feas_tol`
+    # ppm) within `rtol` of `cost`, or None
+    def simulations_to_optimum(self, cost, rtol=1e-4, feas_tol=1e-4):
+        for simulations, point_cost, violation, _ in self.history:
+            if violation <= feas_tol and point_cost <= cost * (1 + rtol):
+                return simulations
+        return None
+
+    # Wall time (s) until the first feasible point within `rtol` of `cost`, or None
+    def time_to_optimum(self, cost, rtol=1e-4, feas_tol=1e-4):
+        for _, point_cost, violation, elapsed_s in self.history:
+            if violation <= feas_tol and point_cost <= cost * (1 + rtol):
+                return elapsed_s
+        return None
+
+    # Preload the cache from the checkpoint of an interrupted run with the same settings
+    def resume(self):
+        replayed = self.checkpoint.restore(self.cache, self.failures)
+        self.log_message(f"Resuming from the checkpoint: {replayed} evaluations to replay")
+        if self.checkpoint.restored_complete:
+            self.log_message("The checkpoint is of a completed run: the replay reproduces its result without simulating")
+
+    def optimize(self):
+        bounds = self.problem.bounds()
+        if self.method == 'COBYLA':
+            return minimize(self.cost, self.x0_scaled, method='COBYLA', bounds=bounds,
+                            constraints=self.problem.constraint(self.constraints), options=self.options)
+        if self.method == 'SLSQP':
+            constraint = self.problem.constraint(self.constraints, jac=self.gradient.jacobian(self.constraints))
+            return minimize(self.cost_and_gradient, self.x0_scaled, method='SLSQP', jac=True,
+                            bounds=bounds, constraints=constraint, options=self.options)
+        if self.method == 'trust-constr':
+            constraint = self.problem.constraint(self.constraints, jac=self.gradient.jacobian(self.constraints), hess=BFGS())
+            return minimize(self.cost_and_gradient, self.x0_scaled, method='trust-constr', jac=True,
+                            hess=self.problem.cost_hessian, bounds=bounds, constraints=constraint, options=self.options)
+        if self.method == 'L-BFGS-B':
+            return minimize(self.penalized_cost_and_gradient, self.x0_scaled, method='L-BFGS-B',
+                            jac=True, bounds=bounds, options=self.options)
+        if self.method == 'augmented-lagrangian':
+            from aspen_opt.lagrangian import augmented_lagrangian_minimize
+            return augmented_lagrangian_minimize(self.cost, lambda x: self.problem.cost_gradient(), self.constraints,
+                                                 self.gradient.jacobian(self.constraints), self.x0_scaled, bounds,
+                                                 self.problem.upper, **self.options)
+        if self.method == 'bayesian':
+            from aspen_opt.bayesopt import bayesian_minimize
+            return bayesian_minimize(self.plant_cost, self.simulate_and_record, self.x0_scaled, self.bounds_scaled,
+                                     limits=list(self.problem.upper), **self.options)
+        from aspen_opt.surrogate import surrogate_minimize
+        return surrogate_minimize(self.plant_cost, self.simulate_and_record, self.x0_scaled, self.bounds_scaled,
+                                  limits=list(self.problem.upper), **self.options)
+
+    def report(self, result):
+        self.log_message(f'Optimal values: {self.unscale(result.x)}')
+        self.log_message(f'Minimum cost: {result.fun}')
+        if self.method in ('SLSQP', 'trust-constr'):
+            self.log_message(f'Number of iterations: {result.nit}')
+        self.log_message(f'Number of function evaluations: {result.nfev}')
+        self.log_message(f'Optimization success: {result.success}')
+        self.log_message(f'Message: {result.message}')
+        if 'maxcv' in result:
+            self.log_message(f'Maximum constraint violation (maxcv): {result.maxcv}')
+        if 'constr_violation' in result:
+            self.log_message(f'Maximum constraint violation: {result.constr_violation}')
+        self.log_message(f'Number of Aspen simulations ({self.method}): {self.simulations}')
+        self.log_message(f'Simulations to the feasible optimum: {self.simulations_to_optimum(result.fun)}')
+        # Final simulation with the optimal values
+        self.simulate(result.x, print_temperature=True)
+
+    def close(self):
+        self.recorder.close()
+        self.log_message(self.cache.summary())
+        self.log_message(f"Failed simulations: {len(self.failures)}")
+        self.log_message(self.store.summary())
+        self.store.close()
+        self.checkpoint.close(complete=self.completed)
+        self.log_message(self.checkpoint.summary())
+        self.log_message(self.timer.summary())
+        self.timer.write_summary(self.output_path('_timing_summary.json'))
+        self.timer.close()
+        self.evaluation_log.close()
+        self.pool.close()
+
+    # Optimize, report and close; returns the SciPy-style result
+    def run(self, resume=False):
+        if resume:
+            self.resume()
+        start = time.perf_counter()
+        try:
+            result = self.optimize()
+            self.completed = True
+            self.report(result)
+            self.log_message(f'Wall time: {time.perf_counter() - start:.1f} s')
+        finally:
+            self.close()
+        return result
@@ -0,0 +1,216 @@
+import argparse
+import csv
+import os
+import sys
+import threading
+import time
+from functools import partial
+
+import numpy as np
+from scipy.optimize import minimize
+
+from aspen_opt.backends import backend_kind, make_backend
+from aspen_opt.benchmark import DEFAULT_MODEL_FILE
+from aspen_opt.pool import SimulatorPool
+from aspen_opt.problem import PROBLEMS
+from aspen_opt.simulator import SharedSimulator
+from aspen_opt.store import ResultStore
+
+# Default grid of the sweep (ppm); the scripts' limits are 0.2 and 15
+H2S_LIMITS = [0.1, 0.15, 0.2, 0.3]
+NH3_LIMITS = [10, 15, 20]
+
+FIELDS = ['H2S_limit', 'NH3_limit', 'cost', 'x', 'H2S_ppm', 'NH3_ppm', 'max_violation', 'evaluations', 'warm_start',
+          'status']
+
+
+# Minimize the plant cost of `problem` with COBYLA (native bounds and the vector
+# constraint) from the non-scaled `x0`, on a shared simulator. A warm start begins
+# with a smaller trust region (`rhobeg`, scaled inputs), as the optimum of a
+# neighbouring limit is already close.
+def solve_limits(problem, simulator, x0, rhobeg=1.0, tol=1e-2, maxiter=10000):
+    evaluations = 0
+
+    def outputs(x_scaled):
+        nonlocal evaluations
+        evaluations += 1
+        return problem.outputs(simulator(problem.unscale(x_scaled)))
+
+    x0_scaled = np.clip(problem.scale(x0), *np.array(problem.bounds_scaled, dtype=float).T)
+    result = minimize(problem.cost, x0_scaled, method='COBYLA', bounds=problem.bounds(),
+                      constraints=problem.constraint(outputs), options={'rhobeg': rhobeg, 'tol': tol, 'maxiter': maxiter})
+    simulated = simulator(problem.unscale(result.x))
+    y = problem.outputs(simulated)
+    return {
+        'H2S_limit': float(problem.upper[0]),
+        'NH3_limit': float(problem.upper[1]),
+        'cost': float(result.fun),
+        'x': [float(v) for v in problem.unscale(result.x)],
+        'H2S_ppm': float(y[0]),
+        'NH3_ppm': float(y[1]),
+        'max_violation': float(np.max(problem.violations(simulated))),
+        'evaluations': evaluations,
+        'status': str(result.message).strip(),
+    }
+
+
+# Epsilon-constraint sweep over the grid of (H2S limit, NH3 limit) pairs. Each NH3
+# limit is a branch, solved in its own thread; along a branch the H2S limits go
+# from the tightest to the loosest, and each solve starts from the optimum of the
+# previous one (which is feasible for the looser limit) with `warm_rhobeg`. The
+# first solve of a branch starts from the problem's x0. `simulator` maps
+# non-scaled inputs to a simulation result; a SharedSimulator shares its cache
+# (and in-flight simulations) between the branches. `simulator_factory`, if given,
+# makes a new simulator for every solve instead (no sharing). Returns one row per
+# grid point, in grid order.
+def sweep(problem, simulator, h2s_limits=H2S_LIMITS, nh3_limits=NH3_LIMITS, warm_start=True, warm_rhobeg=0.25,
+          simulator_factory=None):
+    h2s_limits = sorted(h2s_limits)
+    rows = {}
+
+    def branch(nh3_limit):
+        x0, warm = problem.x0, False
+        for h2s_limit in h2s_limits:
+            limited = problem.with_limits({'H2S': h2s_limit, 'NH3': nh3_limit})
+            row = solve_limits(limited, simulator_factory() if simulator_factory else simulator, x0,
+                               rhobeg=warm_rhobeg if warm else 1.0)
+            row['warm_start'] = warm
+            rows[h2s_limit, nh3_limit] = row
+            if warm_start and row['max_violation'] <= 0:
+                x0, warm = row['x'], True
+
+    threads = [threading.Thread(target=branch, args=(nh3_limit,), name=f"NH3-{nh3_limit}") for nh3_limit in nh3_limits]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return [rows[h2s_limit, nh3_limit] for h2s_limit in h2s_limits for nh3_limit in nh3_limits]
+
+
+# Minimum cost at each grid point (rows: H2S limit, columns: NH3 limit); '-' where
+# no feasible point was found
+def surface_table(rows):
+    h2s_limits = sorted({row['H2S_limit'] for row in rows})
+    nh3_limits = sorted({row['NH3_limit'] for row in rows})
+    cells = {(row['H2S_limit'], row['NH3_limit']): row for row in rows}
+    header = 'H2S \\ NH3 (ppm)'
+    lines = [f"{header:>16}" + ''.join(f"{nh3:>14g}" for nh3 in nh3_limits)]
+    for h2s in h2s_limits:
+        line = f"{h2s:>16g}"
+        for nh3 in nh3_limits:
+            row = cells[h2s, nh3]
+            line += f"{row['cost']:>14.1f}" if row['max_violation'] <= 1e-4 else f"{'-':>14}"
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def write_rows(rows, path):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(dict(row, x=' '.join(f"{v:.6g}" for v in row['x'])))
+
+
+# Cost against the two limits as a 3D surface
+def plot_surface(rows, path, show=False):
+    from aspen_opt.plots import _pyplot
+
+    plt = _pyplot(show)
+    h2s_limits = sorted({row['H2S_limit'] for row in rows})
+    nh3_limits = sorted({row['NH3_limit'] for row in rows})
+    cells = {(row['H2S_limit'], row['NH3_limit']): row for row in rows}
+    H2S, NH3 = np.meshgrid(h2s_limits, nh3_limits, indexing='ij')
+    cost = np.array([[cells[h2s, nh3]['cost'] if cells[h2s, nh3]['max_violation'] <= 1e-4 else np.nan
+                      for nh3 in nh3_limits] for h2s in h2s_limits])
+    fig = plt.figure(figsize=(9, 7))
+    ax = fig.add_subplot(projection='3d')
+    ax.plot_surface(H2S, NH3, cost, cmap='viridis', alpha=0.8)
+    ax.scatter(H2S, NH3, cost, color='red', s=30)
+    ax.set_xlabel('H2S limit (ppm)', labelpad=10)
+    ax.set_ylabel('NH3 limit (ppm)', labelpad=10)
+    ax.set_zlabel('Minimum cost', labelpad=10)
+    ax.set_title('Cost vs H2S and NH3 specifications')
+    plt.savefig(path, bbox_inches='tight')
+    print(f'Trade-off surface saved as: {os.path.abspath(path)}')
+    if show:
+        plt.show()
+    plt.close(fig)
+
+
+# Sweep the grid with warm starts on one shared cache, then solve every grid point
+# independently from x0 (own cache per solve), both with one thread per NH3 limit
+# on the same pool and without a result store, and report the simulations and
+# wall time of each
+def compare(model_path, variables=4, h2s_limits=H2S_LIMITS, nh3_limits=NH3_LIMITS, workers=None, backend=None):
+    problem = PROBLEMS[variables]
+    backend = backend or backend_kind()
+    with SimulatorPool(partial(make_backend, os.path.abspath(model_path), backend),
+                       size=workers or len(nh3_limits)) as pool:
+        start = time.perf_counter()
+        shared = SharedSimulator(pool, problem.names)
+        rows = sweep(problem, shared, h2s_limits, nh3_limits)
+        sweep_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        independent = []
+
+        def fresh():
+            simulator = SharedSimulator(pool, problem.names)
+            independent.append(simulator)
+            return simulator
+
+        reference = sweep(problem, None, h2s_limits, nh3_limits, warm_start=False, simulator_factory=fresh)
+        reference_time = time.perf_counter() - start
+    reference_simulations = sum(simulator.simulations for simulator in independent)
+    worst = max(abs(row['cost'] - other['cost']) / other['cost'] for row, other in zip(rows, reference))
+    lines = [
+        surface_table(rows),
+        f"Sweep (warm starts, shared cache): {shared.simulations} simulations, wall time {sweep_time:.1f} s",
+        f"Independent runs from x0: {reference_simulations} simulations, wall time {reference_time:.1f} s",
+        f"Simulations saved: {reference_simulations - shared.simulations} "
+        f"({100 * (reference_simulations - shared.simulations) / max(reference_simulations, 1):.0f}%); "
+        f"largest cost difference to the independent runs {100 * worst:.3f}%",
+    ]
+    return rows, '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Pareto sweep of the minimum cost over H2S and NH3 limits')
+    parser.add_argument('--model', default=DEFAULT_MODEL_FILE)
+    parser.add_argument('--variables', type=int, default=4, choices=sorted(PROBLEMS))
+    parser.add_argument('--h2s', type=float, nargs='+', default=H2S_LIMITS, help='H2S limits (ppm)')
+    parser.add_argument('--nh3', type=float, nargs='+', default=NH3_LIMITS, help='NH3 limits (ppm)')
+    parser.add_argument('--workers', type=int, help='simulator instances (default: one per NH3 limit)')
+    parser.add_argument('--backend', default=backend_kind(), choices=['standin', 'aspen'])
+    parser.add_argument('--no-store', action='store_true', help='do not read or add to the result store')
+    parser.add_argument('--compare', action='store_true', help='also solve every grid point independently from x0')
+    parser.add_argument('--output', default='pareto_surface.csv', help='CSV of the grid points')
+    parser.add_argument('--plot', help='save the trade-off surface to this PNG')
+    parser.add_argument('--show', action='store_true', help='also show the plot on screen')
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        rows, report = compare(args.model, args.variables, args.h2s, args.nh3, args.workers, args.backend)
+    else:
+        problem = PROBLEMS[args.variables]
+        store = None if args.no_store else ResultStore(os.path.abspath(args.model), backend=args.backend)
+        start = time.perf_counter()
+        with SimulatorPool(partial(make_backend, os.path.abspath(args.model), args.backend),
+                           size=args.workers or len(args.nh3)) as pool:
+            simulator = SharedSimulator(pool, problem.names, store)
+            rows = sweep(problem, simulator, args.h2s, args.nh3)
+        report = (f"{surface_table(rows)}\nSimulations: {simulator.simulations} for "
+                  f"{sum(row['evaluations'] for row in rows)} evaluations; wall time {time.perf_counter() - start:.1f} s")
+        if store is not None:
+            print(store.summary(), file=sys.stderr)
+            store.close()
+    write_rows(rows, args.output)
+    print(report)
+    print(f"Grid points written to {os.path.abspath(args.output)}")
+    if args.plot:
+        plot_surface(rows, args.plot, args.show)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+import argparse
+import os
+import subprocess
+import sys
+from itertools import combinations
+
+import numpy as np
+
+from aspen_opt.recorder import TrajectoryRecorder
+
+# matplotlib is imported inside the functions, so runs without plots never load it.
+# Plots are rendered from the trajectory CSV by a separate process (render_in_background
+# or python -m aspen_opt.plots), so an optimization never waits for them.
+
+# Longest path drawn point by point; longer trajectories are decimated
+MAX_POINTS = 2000
+
+# Paths up to this length get a marker on every point
+MAX_MARKERS = 500
+
+
+# Indices of at most `max_points` evaluations spread evenly along a trajectory of
+# `n` evaluations, always keeping the first and the last one
+def decimate(n, max_points=MAX_POINTS):
+    if n <= max_points:
+        return np.arange(n)
+    return np.unique(np.linspace(0, n - 1, max_points).round().astype(int))
+
+
+def _pyplot(show):
+    import matplotlib
+    if not show:
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+
+# One 3D plot of the optimization path per pair of inputs against the cost, with
+# the optimal point; 3 plots in a row for 3 variables, 2 rows of 3 for 4 variables
+def plot_trajectory_3d(recorder, opt, cost_min, path, show=False, max_points=MAX_POINTS):
+    plt = _pyplot(show)
+
+    names = recorder.input_names
+    keep = decimate(len(recorder), max_points)
+    x_values = np.array(recorder.inputs(), dtype=float).reshape(-1, len(names))[keep]
+    objective_values = np.array(recorder.column('cost'), dtype=float)[keep]
+    marker = 'o' if len(keep) <= MAX_MARKERS else None
+    pairs = list(combinations(range(len(names)), 2))
+    rows = (len(pairs) + 2) // 3
+
+    # Larger figure and azimuth for the 4-variable grid, as in the original scripts
+    fig = plt.figure(figsize=(18 * rows, 6 * rows))
+    elev_angle = 30
+    azim_angle = 110 if rows == 1 else 130
+
+    # Padding value between axis tick values and axis titles
+    axis_labelpad = 10
+    axis_titlepad = 20 if rows == 1 else 10
+
+    for k, (i, j) in enumerate(pairs):
+        ax = fig.add_subplot(rows, 3, k + 1, projection='3d')
+        ax.plot(x_values[:, i], x_values[:, j], objective_values, color='red', linestyle='-', marker=marker,
+                label='Optimization Path')
+        ax.scatter(opt[i], opt[j], cost_min, color='blue', s=100, label='Optimal Point')
+        ax.set_xlabel(names[i], labelpad=axis_labelpad)
+        ax.set_ylabel(names[j], labelpad=axis_labelpad)
+        ax.set_zlabel('Cost', labelpad=axis_labelpad)
+        ax.set_title(f'{names[i]} vs {names[j]} vs Cost', pad=axis_titlepad)
+        ax.view_init(elev=elev_angle, azim=azim_angle)
+        ax.legend()
+
+    # Adjust the overall layout with margins to avoid trimming
+    plt.subplots_adjust(left=0.05, right=0.95, top=0.90, bottom=0.10, wspace=0.3)
+    plt.savefig(path, bbox_inches='tight')
+    print(f'3D plots saved as: {os.path.abspath(path)}')
+    if show:
+        plt.show()
+    plt.close(fig)
+
+
+# Cost, H2S and NH3 of every evaluation, as recorded during the optimization
+def plot_evolution(recorder, path, show=False, max_points=MAX_POINTS):
+    plt = _pyplot(show)
+
+    keep = decimate(len(recorder), max_points)
+    objective_values = np.array(recorder.column('cost'), dtype=float)[keep]
+    cH2S_values = np.array(recorder.column('H2S_ppm'), dtype=float)[keep]
+    cNH3_values = np.array(recorder.column('NH3_ppm'), dtype=float)[keep]
+    markers = len(keep) <= MAX_MARKERS
+    fig, (ax1, ax2, ax3) = plt.subplots(3, 1, figsize=(12, 18))
+
+    ax1.plot(keep, objective_values, color='blue', label='Cost Function', marker='o' if markers else None)
+    ax1.set_xlabel('Iteration', fontsize=12)
+    ax1.set_ylabel('Cost', fontsize=12)
+    ax1.set_title('Evolution of Cost Function', fontsize=14)
+    ax1.legend(loc='best')
+
+    ax2.plot(keep, cH2S_values, color='green', label='cH2S_ppm', marker='x' if markers else None)
+    ax2.set_xlabel('Iteration', fontsize=12)
+    ax2.set_ylabel('cH2S_ppm', fontsize=12)
+    ax2.set_title('Evolution of H2S Concentration (ppm)', fontsize=14)
+    ax2.legend(loc='best')
+
+    ax3.plot(keep, cNH3_values, color='red', label='cNH3_ppm', marker='x' if markers else None)
+    ax3.set_xlabel('Iteration', fontsize=12)
+    ax3.set_ylabel('cNH3_ppm', fontsize=12)
+    ax3.set_title('Evolution of NH3 Concentration (ppm)', fontsize=14)
+    ax3.legend(loc='best')
+
+    plt.tight_layout()
+    plt.savefig(path, bbox_inches='tight')
+    print(f'Evolution plot saved as: {os.path.abspath(path)}')
+    if show:
+        plt.show()
+    plt.close(fig)
+
+
+# Render the `kinds` of plots ('3d', 'evolution') of a recorded trajectory to
+# <base_path>_3d_plots.png and <base_path>_evolution_subplots.png
+def render(trajectory_path, base_path, kinds, opt=None, cost_min=None, show=False, max_points=MAX_POINTS):
+    recorder = TrajectoryRecorder.load(trajectory_path)
+    if '3d' in kinds:
+        plot_trajectory_3d(recorder, opt, cost_min, base_path + '_3d_plots.png', show, max_points)
+    if 'evolution' in kinds:
+        plot_evolution(recorder, base_path + '_evolution_subplots.png', show, max_points)
+
+
+# Start the render stage in its own process and return it without waiting; with
+# show=False it uses the non-interactive Agg backend
+def render_in_background(trajectory_path, base_path, kinds, opt, cost_min, show=False, max_points=MAX_POINTS):
+    command = [sys.executable, '-m', 'aspen_opt.plots', trajectory_path, base_path, '--cost', repr(float(cost_min)),
+               '--max-points', str(max_points), '--optimum'] + [repr(float(v)) for v in opt]
+    for kind in kinds:
+        command += ['--kind', kind]
+    if show:
+        command.append('--show')
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([os.path.dirname(os.path.dirname(os.path.abspath(__file__)))]
+                                        + [p for p in [env.get('PYTHONPATH')] if p])
+    if not show:
+        env['MPLBACKEND'] = 'Agg'
+    return subprocess.Popen(command, env=env)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render the plots of a recorded optimization trajectory')
+    parser.add_argument('trajectory', help='<name>_trajectory.csv written by the run')
+    parser.add_argument('base_path', help='output path without the _3d_plots.png / _evolution_subplots.png suffix')
+    parser.add_argument('--kind', action='append', choices=['3d', 'evolution'], help='default: both')
+    parser.add_argument('--optimum', type=float, nargs='+', help='optimal non-scaled inputs (3d plots)')
+    parser.add_argument('--cost', type=float, help='minimum cost (3d plots)')
+    parser.add_argument('--max-points', type=int, default=MAX_POINTS, help='decimate longer trajectories')
+    parser.add_argument('--show', action='store_true', help='also show the plots on screen')
+    args = parser.parse_args(argv)
+    kinds = args.kind or ['3d', 'evolution']
+    if '3d' in kinds and (args.optimum is None or args.cost is None):
+        parser.error('the 3d plots need --optimum and --cost')
+    render(args.trajectory, args.base_path, kinds, args.optimum, args.cost, args.show, args.max_points)
+
+
+if __name__ == '__main__':
+    main()
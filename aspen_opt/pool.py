@@ -0,0 +1,105 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from aspen_opt.backends import evaluate
+
+
+# Pool of N independent simulator instances. Each worker thread builds its own
+# backend with `backend_factory` (e.g. functools.partial(make_backend, aspen_Path))
+# and evaluations are handed out as futures; a finished future carries the solve
+# time in `elapsed_s` (not counting an archive reload). An optional PhaseTimer
+# times the phases of every evaluation.
+class SimulatorPool:
+    def __init__(self, backend_factory, size=1, timer=None):
+        self.size = size
+        self.timer = timer
+        self._backend_factory = backend_factory
+        self.reloads = 0
+        self._lock = threading.Lock()
+        self._tasks = queue.Queue()
+        self._startup_errors = []
+        self._ready = threading.Barrier(size + 1)
+        self._workers = [threading.Thread(target=self._worker, name=f"simulator-{i}", daemon=True) for i in range(size)]
+        for worker in self._workers:
+            worker.start()
+        self._ready.wait()
+        if self._startup_errors:
+            self.close()
+            raise self._startup_errors[0]
+
+    def _worker(self):
+        try:
+            backend = self._backend_factory()
+        except Exception as e:
+            self._startup_errors.append(e)
+            self._ready.wait()
+            return
+        self._ready.wait()
+        last_inputs = None
+        try:
+            while True:
+                task = self._tasks.get()
+                if task is None:
+                    break
+                chain, reload_if = task
+                for future, inputs in chain:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    start = time.perf_counter()
+                    try:
+                        if reload_if is not None and last_inputs is not None and reload_if(last_inputs, inputs):
+                            self._reload(backend)
+                            future.reloaded = True
+                        last_inputs = inputs
+                        start = time.perf_counter()
+                        result = evaluate(backend, inputs, self.timer)
+                    except Exception as e:
+                        future.elapsed_s = time.perf_counter() - start
+                        future.set_exception(e)
+                    else:
+                        future.elapsed_s = time.perf_counter() - start
+                        future.set_result(result)
+        finally:
+            backend.close()
+
+    def _reload(self, backend):
+        with self._lock:
+            self.reloads += 1
+        if self.timer is None:
+            backend.reload()
+        else:
+            with self.timer.time('reload'):
+                backend.reload()
+
+    # Queue one evaluation; `inputs` maps input names (QN1, QN2, QC, SF) to non-scaled values
+    def submit(self, inputs):
+        return self.submit_chain([inputs])[0]
+
+    # Queue evaluations that one instance runs back to back, in order, so each warm
+    # starts from the previous one. When `reload_if(previous_inputs, inputs)` is true
+    # the archive is reloaded first (a fresh start instead of a long jump); such
+    # futures get `reloaded = True`.
+    def submit_chain(self, inputs_list, reload_if=None):
+        chain = [(Future(), inputs) for inputs in inputs_list]
+        self._tasks.put((chain, reload_if))
+        return [future for future, _ in chain]
+
+    # Evaluate a batch concurrently and return the results in order
+    def map(self, inputs_list):
+        futures = [self.submit(inputs) for inputs in inputs_list]
+        return [future.result() for future in futures]
+
+    def close(self):
+        for worker in self._workers:
+            if worker.is_alive():
+                self._tasks.put(None)
+        for worker in self._workers:
+            worker.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
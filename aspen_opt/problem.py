@@ -0,0 +1,138 @@
+import numpy as np
+from scipy.optimize import Bounds, NonlinearConstraint
+
+from aspen_opt.backends import INPUT_NODES, OUTPUT_NODES, TEMPERATURE_OUTPUTS
+
+# Position of each limited output in a simulation result (cH2S_ppm, cNH3_ppm, temperatures)
+RESULT_INDEX = {'H2S': 0, 'NH3': 1}
+
+
+# An input of the flowsheet: initial guess, scale factor, non-scaled bounds, weight
+# in the plant cost and the Aspen Plus tree path it is written to
+class Variable:
+    def __init__(self, name, x0, scale, bounds, cost=0.0, node=None):
+        self.name = name
+        self.x0 = x0
+        self.scale = scale
+        self.bounds = bounds
+        self.cost = cost
+        self.node = node or INPUT_NODES[name]
+
+
+# An upper limit (ppm) on an output of the flowsheet, read from an Aspen Plus tree path
+class OutputLimit:
+    def __init__(self, name, limit, node=None):
+        self.name = name
+        self.limit = limit
+        self.node = node or OUTPUT_NODES[name]
+
+
+# Declarative optimization problem: minimize the weighted sum of the inputs subject
+# to upper limits on simulated outputs. The problem compiles to what SciPy handles
+# natively: `bounds()` for the box and `constraint()`, one vector-valued
+# NonlinearConstraint whose components all come from a single simulation, instead
+# of a Python function per bound and a function (and cache lookup) per limit.
+# Optimizers work on the scaled inputs x / scale.
+class Problem:
+    def __init__(self, variables, limits):
+        self.variables = list(variables)
+        self.limits = list(limits)
+        self.names = [v.name for v in self.variables]
+        self.x0 = [v.x0 for v in self.variables]
+        self.scale_factors = [v.scale for v in self.variables]
+        self.bounds_unscaled = [v.bounds for v in self.variables]
+        self.cost_weights = np.array([v.cost for v in self.variables], dtype=float)
+        self.upper = np.array([o.limit for o in self.limits], dtype=float)
+
+    def __len__(self):
+        return len(self.variables)
+
+    def scale(self, x):
+        return [v / s for v, s in zip(x, self.scale_factors)]
+
+    def unscale(self, x_scaled):
+        return [v * s for v, s in zip(x_scaled, self.scale_factors)]
+
+    @property
+    def x0_scaled(self):
+        return self.scale(self.x0)
+
+    @property
+    def bounds_scaled(self):
+        return [(low / s, high / s) for (low, high), s in zip(self.bounds_unscaled, self.scale_factors)]
+
+    # Box constraints on the scaled inputs for minimize(bounds=...)
+    def bounds(self):
+        lower, upper = np.array(self.bounds_scaled, dtype=float).T
+        return Bounds(lower, upper)
+
+    # Plant cost of the scaled inputs, and its exact (constant) gradient
+    def cost(self, x_scaled):
+        return float(np.dot(self.cost_weights, self.unscale(x_scaled)))
+
+    def cost_gradient(self):
+        return self.cost_weights * np.array(self.scale_factors, dtype=float)
+
+    def cost_hessian(self, x_scaled):
+        return np.zeros((len(self), len(self)))
+
+    # Limited outputs of a simulation result, in the order of `limits`
+    def outputs(self, result):
+        return np.array([result[RESULT_INDEX[o.name]] for o in self.limits], dtype=float)
+
+    # Amount by which each limit is exceeded (0 when it is met)
+    def violations(self, result):
+        return np.maximum(self.outputs(result) - self.upper, 0.0)
+
+    # Sum of the squared amounts by which the limited outputs `y` exceed their limits,
+    # and its gradient given the Jacobian `J` of the outputs (penalized cost)
+    def penalty(self, y):
+        return float(np.sum(np.maximum(np.asarray(y, dtype=float) - self.upper, 0.0) ** 2))
+
+    def penalty_gradient(self, y, J):
+        return 2 * np.maximum(np.asarray(y, dtype=float) - self.upper, 0.0) @ np.atleast_2d(J)
+
+    # outputs(x_scaled) <= limits as one NonlinearConstraint; `outputs` returns the
+    # limited outputs of a (cached) simulation of the scaled point
+    def constraint(self, outputs, jac='2-point', hess=None):
+        options = {} if hess is None else {'hess': hess}
+        return NonlinearConstraint(outputs, -np.inf, self.upper, jac=jac, **options)
+
+    # Aspen Plus tree paths of the inputs and outputs, for AspenBackend
+    def input_nodes(self):
+        return {v.name: v.node for v in self.variables}
+
+    def output_nodes(self):
+        nodes = {name: OUTPUT_NODES[name] for name in ['H2S', 'NH3'] + TEMPERATURE_OUTPUTS + ['run_errors']}
+        nodes.update((o.name, o.node) for o in self.limits)
+        return nodes
+
+    # The same problem with other values of some limits, e.g. {'H2S': 0.1}
+    def with_limits(self, limits):
+        unknown = set(limits) - {o.name for o in self.limits}
+        if unknown:
+            raise ValueError(f"Unknown limits: {sorted(unknown)}")
+        return Problem(self.variables, [OutputLimit(o.name, limits.get(o.name, o.limit), o.node) for o in self.limits])
+
+    # (names, x0, scale factors, bounds) as in benchmark.VARIANTS
+    def variant(self):
+        return self.names, self.x0, self.scale_factors, self.bounds_unscaled
+
+
+# H2S <= 0.2 ppm and NH3 <= 15 ppm in the treated water (stream AGUAR1)
+LIMITS = [OutputLimit('H2S', 0.2), OutputLimit('NH3', 15)]
+
+# Heat duties of the two columns (QN1, QN2) and the condenser (QC) are the plant
+# cost; the split fraction SF is free
+VARIABLES = [
+    Variable('QN1', 560000, 1e5, (450000, 600000), cost=1.0),
+    Variable('QN2', 950000, 1e5, (700000, 1200000), cost=1.0),
+    Variable('QC', 3, 1, (1, 5), cost=1.0),
+    Variable('SF', 0.5, 0.1, (0, 1)),
+]
+
+# The scripts' problems: QN1, QN2, QC (SF stays at its archive value), or all four inputs
+PROBLEMS = {
+    3: Problem(VARIABLES[:3], LIMITS),
+    4: Problem(VARIABLES, LIMITS),
+}
@@ -0,0 +1,60 @@
+import csv
+import time
+
+
+# Records every evaluation of an optimization run as it happens (inputs, cost,
+# H2S/NH3 ppm and wall time since the previous evaluation). Rows are appended to
+# a CSV file when a path is given, so plots and later analysis never need to
+# simulate the trajectory again.
+class TrajectoryRecorder:
+    def __init__(self, input_names, path=None):
+        self.input_names = list(input_names)
+        self.fields = ['eval'] + self.input_names + ['cost', 'H2S_ppm', 'NH3_ppm', 'elapsed_s']
+        self.rows = []
+        self.path = path
+        self._last_time = time.perf_counter()
+        self._file = None
+        self._writer = None
+        if path is not None:
+            self._file = open(path, 'w', newline='')
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(self.fields)
+            self._file.flush()
+
+    def record(self, x, cost, cH2S_ppm, cNH3_ppm):
+        now = time.perf_counter()
+        row = [len(self.rows)] + [float(v) for v in x] + [float(cost), float(cH2S_ppm), float(cNH3_ppm), now - self._last_time]
+        self._last_time = now
+        self.rows.append(row)
+        if self._writer is not None:
+            self._writer.writerow(row)
+            self._file.flush()
+
+    def column(self, name):
+        index = self.fields.index(name)
+        return [row[index] for row in self.rows]
+
+    # Non-scaled input vectors, one per evaluation
+    def inputs(self):
+        n = len(self.input_names)
+        return [row[1:1 + n] for row in self.rows]
+
+    def __len__(self):
+        return len(self.rows)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._writer = None
+
+    # Load a recorded trajectory back from its CSV file
+    @classmethod
+    def load(cls, path):
+        with open(path, newline='') as f:
+            reader = csv.reader(f)
+            fields = next(reader)
+            recorder = cls(fields[1:fields.index('cost')])
+            for row in reader:
+                recorder.rows.append([int(row[0])] + [float(v) for v in row[1:]])
+        return recorder
@@ -0,0 +1,46 @@
+import numpy as np
+
+
+# Points scaled to the unit box of `bounds`
+def unit_scale(points, bounds):
+    lower, upper = np.array(bounds, dtype=float).T
+    return (np.atleast_2d(np.asarray(points, dtype=float)) - lower) / (upper - lower)
+
+
+# Greedy nearest-neighbour chain through `points`, starting from the point closest
+# to `start` (the first point by default); returns the visiting order as indices
+def nearest_neighbour_order(points, start=None):
+    points = np.asarray(points, dtype=float)
+    remaining = np.ones(len(points), dtype=bool)
+    current = 0 if start is None else int(np.argmin(np.linalg.norm(points - start, axis=1)))
+    order = []
+    while True:
+        order.append(current)
+        remaining[current] = False
+        candidates = np.flatnonzero(remaining)
+        if len(candidates) == 0:
+            return order
+        current = int(candidates[np.argmin(np.linalg.norm(points[candidates] - points[current], axis=1))])
+
+
+# Split one nearest-neighbour chain through `points` into chains of at most
+# `chain_length` consecutive points. Each chain goes to one simulator instance, so
+# every run warm starts close to the previous one; short chains keep the instances
+# evenly loaded.
+def schedule_chains(points, chain_length=16, start=None):
+    order = nearest_neighbour_order(points, start)
+    return [order[i:i + chain_length] for i in range(0, len(order), chain_length)]
+
+
+# Reload rule for SimulatorPool.submit_chain: start from the archive instead of the
+# previous solution when the jump between inputs, in the unit box of `bounds`, is
+# longer than `max_jump`
+class JumpLimit:
+    def __init__(self, names, bounds, max_jump):
+        self.names = list(names)
+        self.bounds = bounds
+        self.max_jump = max_jump
+
+    def __call__(self, previous, inputs):
+        a, b = unit_scale([[previous[name] for name in self.names], [inputs[name] for name in self.names]], self.bounds)
+        return float(np.linalg.norm(a - b)) > self.max_jump
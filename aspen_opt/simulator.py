@@ -0,0 +1,79 @@
+import threading
+
+from aspen_opt.backends import SimulationError, failed_result, is_failed
+from aspen_opt.cache import SimulationCache
+
+
+# The one cached evaluation path of the package, in front of a SimulatorPool. Points
+# are cached as given (e.g. scaled inputs, with `unscale` mapping them to the
+# non-scaled inputs the pool and the result store use), failed points are kept
+# apart from the valid results, points in the result store are not simulated
+# again, and the points of a batch that are left are simulated all at once across
+# the pool. Safe to share between threads: a point requested by several callers at
+# once is simulated once (the others wait for the same future).
+# `on_result(point, result, elapsed_s)`, if given, is called once for every result
+# new to the cache: with the solve time for a simulation, with None for a
+# result store hit. Points within `cache_tol` of each other (every component)
+# share one cache entry.
+class SharedSimulator:
+    def __init__(self, pool, names, store=None, failure_ppm=1e3, unscale=None, on_result=None, cache_size=1 << 20,
+                 cache_tol=1e-9):
+        self.pool = pool
+        self.names = list(names)
+        self.store = store
+        self.failure_ppm = failure_ppm
+        self.unscale = unscale or (lambda point: point)
+        self.on_result = on_result
+        self.cache = SimulationCache(tol=cache_tol, maxsize=cache_size)
+        self.failures = SimulationCache(tol=cache_tol, maxsize=cache_size)
+        self.simulations = 0
+        self.requests = 0
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    # (cH2S_ppm, cNH3_ppm, temperatures) at `point`
+    def __call__(self, point):
+        return self.simulate_batch([point])[0]
+
+    def simulate_batch(self, points):
+        results = [None] * len(points)
+        pending = []
+        new = []
+        with self._lock:
+            for i, point in enumerate(points):
+                key = tuple(float(v) for v in point)
+                self.requests += 1
+                results[i] = self.cache.get(key)
+                if results[i] is None:
+                    results[i] = self.failures.get(key)
+                if results[i] is not None:
+                    continue
+                x = self.unscale(key)
+                if self.store is not None:
+                    results[i] = self.store.get(x)
+                    if results[i] is not None:
+                        self.cache.put(key, results[i])
+                        new.append((key, results[i], None))
+                        continue
+                future = self._in_flight.get(key)
+                if future is None:
+                    future = self.pool.submit(dict(zip(self.names, x)))
+                    self._in_flight[key] = future
+                    self.simulations += 1
+                pending.append((i, key, x, future))
+        for i, key, x, future in pending:
+            try:
+                results[i] = future.result()
+            except SimulationError as e:
+                results[i] = failed_result(e, self.failure_ppm)
+            with self._lock:
+                if self._in_flight.pop(key, None) is None:
+                    continue  # recorded by the caller that got it first
+                (self.failures if is_failed(results[i]) else self.cache).put(key, results[i])
+                if self.store is not None:
+                    self.store.put(x, results[i], status='failed' if is_failed(results[i]) else 'ok')
+            new.append((key, results[i], getattr(future, 'elapsed_s', 0.0)))
+        if self.on_result is not None:
+            for key, result, elapsed_s in new:
+                self.on_result(key, result, elapsed_s)
+        return results
@@ -0,0 +1,161 @@
+import functools
+import glob
+import os
+import re
+import threading
+
+import numpy as np
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Trajectories of the full model the stand-in is calibrated from. The 3-variable
+# runs leave SF at its archive value (0.5); the _SM logs come from another model.
+DEFAULT_CALIBRATION_LOGS = sorted(
+    glob.glob(os.path.join(REPO_DIR, '*_4_variables.log'))
+    + [path for path in glob.glob(os.path.join(REPO_DIR, '3_variables', '*.log')) if not path.endswith('_SM.log')]
+)
+
+# Trajectories of the simplified model (UTAA_revK_SM.bkp)
+SM_CALIBRATION_LOGS = sorted(glob.glob(os.path.join(REPO_DIR, '3_variables', '*_SM.log')))
+
+ARCHIVE_SF = 0.5
+
+
+# Calibration logs matching a model file: the _SM logs for UTAA_revK_SM.bkp, the
+# full-model logs otherwise
+def default_calibration_logs(model_path):
+    if model_path is not None and os.path.splitext(os.path.basename(model_path))[0].endswith('_SM'):
+        return SM_CALIBRATION_LOGS
+    return DEFAULT_CALIBRATION_LOGS
+
+LOG_LINE = re.compile(
+    r"Simulating with QN1: ([-\d.e]+), QN2: ([-\d.e]+), QC: ([-\d.e]+)(?:, SF: ([-\d.e]+))?"
+    r" -> H2S: ([-\d.e]+), NH3: ([-\d.e]+)"
+)
+
+# Log-linear fallback around x0, used when no calibration log is available
+FALLBACK_COEFFICIENTS = {
+    'H2S': np.array([np.log(0.106), -1.485, -0.879, 0.019, 0.173] + [0.0] * 10),
+    'NH3': np.array([np.log(13.633), -0.572, -0.403, -0.001, 0.069] + [0.0] * 10),
+}
+
+
+# Unique (QN1, QN2, QC, SF, H2S ppm, NH3 ppm) rows parsed from optimizer logs
+def read_log_points(paths):
+    rows = []
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                match = LOG_LINE.search(line)
+                if match:
+                    QN1, QN2, QC, SF, H2S, NH3 = match.groups()
+                    rows.append([float(QN1), float(QN2), float(QC), ARCHIVE_SF if SF is None else float(SF), float(H2S), float(NH3)])
+    return np.unique(np.array(rows), axis=0) if rows else np.empty((0, 6))
+
+
+# Inputs relative to x0 in units of 1e5 W (QN1, QN2), 1 (QC) and 0.1 (SF)
+def _normalize(x):
+    x = np.atleast_2d(np.asarray(x, dtype=float))
+    return np.column_stack([(x[:, 0] - 560000) / 1e5, (x[:, 1] - 950000) / 1e5, x[:, 2] - 3, (np.maximum(x[:, 3], 0) - 0.5) * 10])
+
+
+# Full quadratic in the normalized inputs (1 + 4 + 10 terms)
+def _features(z):
+    n = z.shape[1]
+    columns = [np.ones(len(z))] + [z[:, i] for i in range(n)] + [z[:, i] * z[:, j] for i in range(n) for j in range(i, n)]
+    return np.column_stack(columns)
+
+
+# Ridge fit of log H2S and log NH3 ppm; cached so every pool instance shares one fit
+@functools.lru_cache(maxsize=None)
+def fit_standin(paths, ridge=1e-3):
+    points = read_log_points(paths)
+    if len(points) < 15:
+        return FALLBACK_COEFFICIENTS
+    F = _features(_normalize(points[:, :4]))
+    A = F.T @ F + ridge * np.eye(F.shape[1])
+    return {
+        'H2S': np.linalg.solve(A, F.T @ np.log(points[:, 4])),
+        'NH3': np.linalg.solve(A, F.T @ np.log(points[:, 5])),
+    }
+
+
+# NumPy stand-in for the UTAA flowsheet with the same set_inputs/run/read_outputs
+# interface as AspenBackend. H2S and NH3 follow a quadratic log-ppm model calibrated
+# from the committed .log trajectories of the same model (full or _SM); temperatures
+# are linear. `latency` (s) adds
+# a solve time per run and `noise` a relative lognormal error, reproducible through
+# `seed`; with the defaults the stand-in is deterministic and instantaneous.
+# `jump_latency` (s per normalized unit) adds solve time growing with the distance
+# from the previously solved inputs (the archive point after a reload), like Aspen's
+# warm starts. A `hang_rate` fraction of runs never finish until kill() is called,
+# and a `failure_rate` fraction do not converge (their outputs are still readable).
+# memory_mb() reports a constant, so only run limits recycle a stand-in.
+class StandInBackend:
+    name = 'standin'
+    can_kill = True
+
+    def __init__(self, model_path=None, latency=0.0, noise=0.0, seed=None, calibration_logs=None, jump_latency=0.0,
+                 hang_rate=0.0, failure_rate=0.0):
+        self.model_path = model_path
+        self.latency = latency
+        self.jump_latency = jump_latency
+        self.hang_rate = hang_rate
+        self.failure_rate = failure_rate
+        self._killed = threading.Event()
+        self.noise = noise
+        if calibration_logs is None:
+            calibration_logs = default_calibration_logs(model_path)
+        self.coefficients = fit_standin(tuple(calibration_logs))
+        self._rng = np.random.default_rng(seed)
+        self.reload()
+
+    def set_inputs(self, inputs):
+        self._inputs.update(inputs)
+
+    def predict(self, x):
+        F = _features(_normalize(x))
+        return np.exp(F @ self.coefficients['H2S']), np.exp(F @ self.coefficients['NH3'])
+
+    def run(self):
+        x = [self._inputs['QN1'], self._inputs['QN2'], self._inputs['QC'], self._inputs['SF']]
+        delay = self.latency + self.jump_latency * float(np.linalg.norm(_normalize(x) - _normalize(self._solved)))
+        if self.hang_rate > 0 and self._rng.random() < self.hang_rate:
+            delay = None
+        if (delay is None or delay > 0) and self._killed.wait(delay):
+            raise RuntimeError('Stand-in simulator killed')
+        self._solved = x
+        self._converged = not (self.failure_rate > 0 and self._rng.random() < self.failure_rate)
+        H2S_ppm, NH3_ppm = (values[0] for values in self.predict(x))
+        if self.noise > 0:
+            H2S_ppm *= np.exp(self.noise * self._rng.standard_normal())
+            NH3_ppm *= np.exp(self.noise * self._rng.standard_normal())
+        dQN1, dQN2, dQC, _ = _normalize(x)[0]
+        self._outputs = {
+            'H2S': float(H2S_ppm) * 1e-6,
+            'NH3': float(NH3_ppm) * 1e-6,
+            'T_bottom_N640': 168.41 + 0.85 * dQN1,
+            'T_bottom_N641': 107.98 + 0.03 * dQN2,
+            'T_top_N641': 104.21 + 0.3 * dQN2 - 0.05 * dQC,
+        }
+
+    def converged(self):
+        return self._converged
+
+    def read_outputs(self, names):
+        return {name: self._outputs[name] for name in names}
+
+    def reload(self):
+        self._inputs = {'QN1': 560000, 'QN2': 950000, 'QC': 3, 'SF': ARCHIVE_SF}
+        self._solved = list(self._inputs.values())
+        self._outputs = {}
+        self._converged = False
+
+    def kill(self):
+        self._killed.set()
+
+    def memory_mb(self):
+        return 0.0
+
+    def close(self):
+        pass
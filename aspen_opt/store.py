@@ -0,0 +1,79 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Shared by every script, whichever directory it is started from
+DEFAULT_STORE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'simulation_results.sqlite')
+
+
+# Identify a model by file name plus a hash of its content, so results from an
+# edited .bkp are never mixed with results from the previous revision. Results of
+# other backends (e.g. the stand-in flowsheet) are kept under their own key.
+def model_key(model_path, backend='aspen'):
+    if backend != 'aspen':
+        return f"{backend}:{os.path.basename(model_path)}"
+    digest = hashlib.sha256()
+    with open(model_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return f"{os.path.basename(model_path)}:{digest.hexdigest()[:16]}"
+
+
+# Inputs are stored unscaled and rounded to 10 significant digits, so scripts
+# with different scale factors still share points
+def input_key(x):
+    return json.dumps([float(f"{float(v):.10g}") for v in x])
+
+
+# Persistent SQLite store of simulation results shared across runs and scripts
+class ResultStore:
+    def __init__(self, model_path, path=DEFAULT_STORE_PATH, backend='aspen'):
+        self.model = model_key(model_path, backend)
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "model TEXT NOT NULL, x TEXT NOT NULL, h2s_ppm REAL, nh3_ppm REAL, "
+            "temperatures TEXT, status TEXT NOT NULL, created REAL NOT NULL, "
+            "PRIMARY KEY (model, x))"
+        )
+        self._conn.commit()
+
+    # Return (cH2S_ppm, cNH3_ppm, temperatures) for a stored successful run, or None
+    def get(self, x):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT h2s_ppm, nh3_ppm, temperatures FROM results WHERE model = ? AND x = ? AND status = 'ok'",
+                (self.model, input_key(x)),
+            ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        cH2S_ppm, cNH3_ppm, temperatures = row
+        return cH2S_ppm, cNH3_ppm, tuple(json.loads(temperatures))
+
+    def put(self, x, result, status='ok'):
+        cH2S_ppm, cNH3_ppm, temperatures = result
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self.model, input_key(x), cH2S_ppm, cNH3_ppm, json.dumps(list(temperatures)), status, time.time()),
+            )
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM results WHERE model = ?", (self.model,)).fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+    def summary(self):
+        return f"Result store ({self.model}): {self.hits} points reused, {self.misses} new, {len(self)} stored"
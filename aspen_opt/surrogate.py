@@ -0,0 +1,206 @@
+import argparse
+import os
+import tempfile
+
+import numpy as np
+from scipy.interpolate import RBFInterpolator
+from scipy.optimize import OptimizeResult, minimize
+from scipy.stats import qmc
+
+
+# Lexicographic comparison used to move the trust-region centre: a feasible point
+# beats an infeasible one, two feasible points compare by cost and two infeasible
+# ones by constraint violation
+def _better(cost_a, violation_a, cost_b, violation_b, feas_tol):
+    if violation_a <= feas_tol and violation_b <= feas_tol:
+        return cost_a < cost_b
+    if violation_a <= feas_tol or violation_b <= feas_tol:
+        return violation_a <= feas_tol
+    return violation_a < violation_b
+
+
+# Surrogate-assisted trust-region optimization. RBF models of the simulated outputs
+# (fitted on log ppm) replace the flowsheet inside the trust region, the cheap
+# `objective` is minimized against them, and the flowsheet is called only to
+# validate each candidate. `simulate_batch(points_scaled)` returns one output tuple
+# per point whose first len(limits) entries are the constrained values
+# (output <= limit, e.g. H2S and NH3 ppm), or None for a failed simulation. Failed
+# simulations (None or non-finite outputs) are kept out of the models and count as
+# infinitely infeasible; failed points of the initial design are replaced by new
+# ones. The result has the same fields as the COBYLA result the scripts report (x, fun, nfev, maxcv, success, message), with
+# nfev counting true simulations. The subproblem keeps the predicted outputs a
+# relative `margin` below the limits: the optimum lies on the constraint boundary,
+# where a candidate the models place exactly on it simulates slightly infeasible.
+# Each such candidate (predicted feasible, simulated infeasible) multiplies the
+# margin by 4 (up to `max_margin`) as well as shrinking the region, and every
+# accepted step divides it by 4 again (down to its initial value). The run
+# succeeds when the models predict a relative cost improvement below `ftol` from a
+# feasible centre; it stops without success when the radius falls below
+# `min_radius` away from such a point, or after `maxiter` iterations when set.
+def surrogate_minimize(objective, simulate_batch, x0, bounds, limits, radius=0.1, min_radius=1e-3,
+                       max_radius=0.5, max_simulations=100, ftol=1e-5, feas_tol=1e-6, kernel='thin_plate_spline',
+                       margin=1e-4, max_margin=0.01, maxiter=None):
+    lower = np.array([low for low, _ in bounds], dtype=float)
+    upper = np.array([high for _, high in bounds], dtype=float)
+    span = upper - lower
+    limits = np.asarray(limits, dtype=float)
+    n = len(lower)
+    min_margin = margin
+
+    # The models and the trust region work in the unit box
+    def to_unit(x):
+        return (np.asarray(x, dtype=float) - lower) / span
+
+    def from_unit(u):
+        return lower + np.asarray(u, dtype=float) * span
+
+    samples = []
+    outputs = []
+    failures = []
+
+    def simulate_unit(points):
+        results = simulate_batch([from_unit(u) for u in points])
+        values = []
+        for u, result in zip(points, results):
+            y = np.full(len(limits), np.nan) if result is None else np.asarray(result[:len(limits)], dtype=float)
+            if np.all(np.isfinite(y)):
+                samples.append(np.asarray(u, dtype=float))
+                outputs.append(y)
+            else:
+                failures.append(np.asarray(u, dtype=float))
+                y = np.full(len(limits), np.inf)
+            values.append(y)
+        return values
+
+    def violation(y):
+        return float(np.max(np.maximum(y - limits, 0.0)))
+
+    # Initial design: x0 plus one step along every axis (enough for the linear RBF tail)
+    center = np.clip(to_unit(x0), 0.0, 1.0)
+    design = [center]
+    for i in range(n):
+        u = center.copy()
+        u[i] = u[i] + radius if u[i] + radius <= 1.0 else u[i] - radius
+        design.append(u)
+    design_outputs = simulate_unit(design)
+
+    # Replace failed design points with a Latin hypercube in the initial trust
+    # region until the models have n + 1 points (or the budget runs out)
+    sampler = qmc.LatinHypercube(d=n, seed=0)
+    while len(samples) <= n and len(samples) + len(failures) < max_simulations:
+        box_lower, box_upper = np.maximum(center - radius, 0.0), np.minimum(center + radius, 1.0)
+        count = min(n + 1 - len(samples), max_simulations - len(samples) - len(failures))
+        extra = list(box_lower + sampler.random(count) * (box_upper - box_lower))
+        design += extra
+        design_outputs += simulate_unit(extra)
+    center_y = design_outputs[0]
+    for u, y in zip(design[1:], design_outputs[1:]):
+        if _better(objective(from_unit(u)), violation(y), objective(from_unit(center)), violation(center_y), feas_tol):
+            center, center_y = u, y
+
+    nit = 0
+    converged = False
+    while radius >= min_radius and len(samples) + len(failures) < max_simulations and (maxiter is None or nit < maxiter):
+        if len(samples) <= n:
+            break
+        nit += 1
+        X = np.array(samples)
+        Y = np.log(np.maximum(np.array(outputs), 1e-12))
+        models = [RBFInterpolator(X, Y[:, k], kernel=kernel, degree=1) for k in range(len(limits))]
+
+        def predicted_log(u):
+            return np.array([model(u[None, :])[0] for model in models])
+
+        # Cheap subproblem: minimize the cost against the models inside the trust
+        # region (cost normalized at the centre, constraints in log ppm, `margin`
+        # inside the limits)
+        f_center = objective(from_unit(center))
+        f_scale = max(abs(f_center), 1.0)
+        box = list(zip(np.maximum(center - radius, 0.0), np.minimum(center + radius, 1.0)))
+        constraints = [{'type': 'ineq', 'fun': lambda u: np.log(limits) - margin - predicted_log(u)}]
+        sub = minimize(lambda u: (objective(from_unit(u)) - f_center) / f_scale, center, method='SLSQP', bounds=box,
+                       constraints=constraints, options={'maxiter': 200, 'ftol': 1e-12})
+        candidate = np.clip(sub.x, 0.0, 1.0)
+
+        # Feasible centre and the models predict no worthwhile improvement: converged
+        if violation(center_y) <= feas_tol and -sub.fun < ftol:
+            converged = True
+            break
+
+        # Too close to a known point: the models cannot improve here, shrink the region
+        if np.min(np.linalg.norm(np.vstack([X] + failures) - candidate, axis=1)) < 1e-3 * radius:
+            radius /= 2
+            continue
+
+        y = simulate_unit([candidate])[0]
+        if _better(objective(from_unit(candidate)), violation(y), objective(from_unit(center)), violation(center_y), feas_tol):
+            on_boundary = np.max(np.abs(candidate - center)) >= 0.9 * radius
+            center, center_y = candidate, y
+            margin = max(margin / 4, min_margin)
+            if on_boundary:
+                radius = min(2 * radius, max_radius)
+        else:
+            if violation(y) > feas_tol and np.all(np.isfinite(y)) and sub.success:
+                # Missed the limits the models said it met: also back off from them
+                margin = min(4 * margin, max_margin)
+            radius /= 2
+
+    x = from_unit(center)
+    maxcv = violation(center_y)
+    if converged:
+        message = 'Predicted improvement below ftol'
+    elif radius < min_radius:
+        message = 'Trust region radius below min_radius'
+    elif len(samples) <= n:
+        message = 'Too few successful simulations to fit the models'
+    elif maxiter is not None and nit >= maxiter:
+        message = 'Maximum number of iterations reached'
+    else:
+        message = 'Maximum number of simulations reached'
+    return OptimizeResult(x=x, fun=objective(x), nfev=len(samples) + len(failures), nit=nit, maxcv=maxcv,
+                          success=maxcv <= feas_tol and converged, message=message)
+
+
+# Run COBYLA and the surrogate method from the same x0, each with its own empty
+# result store, and report the cost, the true simulations and the simulations each
+# needed to reach the best feasible cost of the two
+def compare(model_path, variables=4, output_dir='.', backend=None):
+    from aspen_opt.optimizer import OptimizationRun
+
+    runs = []
+    with tempfile.TemporaryDirectory() as store_dir:
+        for method in ['COBYLA', 'surrogate']:
+            run = OptimizationRun(model_path, variables, method, output_dir=output_dir, backend=backend,
+                                  store_path=os.path.join(store_dir, method + '.sqlite'))
+            runs.append((method, run, run.run()))
+    # Best feasible cost (violation at most 1e-4 ppm) reached by either method, the common target
+    best = min((result.fun for _, run, result in runs if run.max_violation(result.x) <= 1e-4), default=None)
+    lines = [f"{'method':<10} {'cost':>14} {'max viol (ppm)':>15} {'simulations':>12} {'to best':>8}"]
+    for method, run, result in runs:
+        to_best = None if best is None else run.simulations_to_optimum(best, rtol=1e-3)
+        lines.append(f"{method:<10} {result.fun:>14.1f} {run.max_violation(result.x):>15.3g} {run.simulations:>12} "
+                     f"{'-' if to_best is None else to_best:>8}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Surrogate trust-region optimization of the flowsheet')
+    parser.add_argument('--model', default='UTAA_revK.bkp')
+    parser.add_argument('--variables', type=int, default=4, choices=[3, 4])
+    parser.add_argument('--output-dir', default='.')
+    parser.add_argument('--backend', choices=['standin', 'aspen'])
+    parser.add_argument('--compare', action='store_true',
+                        help='run COBYLA and the surrogate method on empty stores and report both')
+    args = parser.parse_args(argv)
+    if args.compare:
+        print(compare(args.model, args.variables, args.output_dir, args.backend))
+        return
+    from aspen_opt.optimizer import OptimizationRun
+
+    run = OptimizationRun(args.model, args.variables, 'surrogate', output_dir=args.output_dir, backend=args.backend)
+    result = run.run()
+    print(f"Cost {result.fun:.1f} after {run.simulations} simulations: {result.message}")
+    return result
+
+if __name__ == '__main__':
+    main()
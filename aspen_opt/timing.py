@@ -0,0 +1,146 @@
+import functools
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# Log-spaced histogram bins from 1 us to ~3 h, 20 per decade
+BINS_PER_DECADE = 20
+MIN_EXPONENT = -6
+MAX_EXPONENT = 4
+
+
+# Running histogram of durations with bounded memory; percentiles are interpolated
+# inside the log-spaced bins (about 6% resolution)
+class DurationHistogram:
+    def __init__(self):
+        self.counts = [0] * ((MAX_EXPONENT - MIN_EXPONENT) * BINS_PER_DECADE + 2)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def _bin(self, seconds):
+        if seconds <= 10 ** MIN_EXPONENT:
+            return 0
+        index = int((math.log10(seconds) - MIN_EXPONENT) * BINS_PER_DECADE) + 1
+        return min(index, len(self.counts) - 1)
+
+    def _edge(self, index):
+        return 10 ** (MIN_EXPONENT + (index - 1) / BINS_PER_DECADE)
+
+    def add(self, seconds):
+        self.counts[self._bin(seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q):
+        if self.count == 0:
+            return math.nan
+        rank = q / 100 * self.count
+        seen = 0
+        for index, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                if index == 0:
+                    return self.min
+                low, high = self._edge(index), self._edge(index + 1)
+                value = low * (high / low) ** ((rank - seen) / n)
+                return min(max(value, self.min), self.max)
+            seen += n
+        return self.max
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'total_s': self.total,
+            'mean_s': self.total / self.count if self.count else math.nan,
+            'min_s': self.min if self.count else math.nan,
+            'p50_s': self.percentile(50),
+            'p90_s': self.percentile(90),
+            'p99_s': self.percentile(99),
+            'max_s': self.max,
+        }
+
+
+# Times the phases of each evaluation (set_inputs, run, read_outputs, log, cost,
+# constraints, ...) into running histograms. Phases timed inside evaluation() are
+# also written, one JSON line per evaluation, to `trace_path`. Thread safe, so one
+# timer can be shared by every worker of a SimulatorPool.
+class PhaseTimer:
+    def __init__(self, trace_path=None):
+        self.histograms = {}
+        self.evaluations = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._trace = open(trace_path, 'w') if trace_path is not None else None
+
+    def add(self, phase, seconds):
+        with self._lock:
+            if phase not in self.histograms:
+                self.histograms[phase] = DurationHistogram()
+            self.histograms[phase].add(seconds)
+        record = getattr(self._local, 'record', None)
+        if record is not None:
+            record['phases'][phase] = record['phases'].get(phase, 0.0) + seconds
+
+    @contextmanager
+    def time(self, phase):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(phase, time.perf_counter() - start)
+
+    # Decorator timing every call of a function (e.g. cost or a constraint) as `phase`
+    def timed(self, phase):
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.time(phase):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    # One evaluation of the simulator; `fields` (e.g. the inputs) go to the trace line
+    @contextmanager
+    def evaluation(self, **fields):
+        record = {'phases': {}}
+        self._local.record = record
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._local.record = None
+            total = time.perf_counter() - start
+            self.add('evaluation', total)
+            with self._lock:
+                self.evaluations += 1
+                if self._trace is not None:
+                    line = dict(fields, eval=self.evaluations - 1, start=time.time() - total, phases=record['phases'], total_s=total)
+                    self._trace.write(json.dumps(line) + '\n')
+                    self._trace.flush()
+
+    def as_dict(self):
+        with self._lock:
+            return {phase: histogram.as_dict() for phase, histogram in self.histograms.items()}
+
+    def summary(self):
+        lines = [f"{'phase':<18} {'count':>6} {'total s':>10} {'mean ms':>10} {'p50 ms':>10} {'p90 ms':>10} {'p99 ms':>10} {'max ms':>10}"]
+        for phase, stats in self.as_dict().items():
+            lines.append(
+                f"{phase:<18} {stats['count']:>6} {stats['total_s']:>10.3f} {stats['mean_s'] * 1e3:>10.3f} "
+                f"{stats['p50_s'] * 1e3:>10.3f} {stats['p90_s'] * 1e3:>10.3f} {stats['p99_s'] * 1e3:>10.3f} {stats['max_s'] * 1e3:>10.3f}"
+            )
+        return '\n'.join(lines)
+
+    def write_summary(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.as_dict(), f, indent=2)
+
+    def close(self):
+        if self._trace is not None:
+            self._trace.close()
+            self._trace = None
@@ -0,0 +1,93 @@
+import threading
+
+from aspen_opt.backends import SimulationTimeout
+
+
+# Backend wrapper that keeps a simulator instance healthy. A run longer than
+# `timeout` seconds has its process killed from a timer thread, so the blocking
+# Run2() call returns; the run raises SimulationTimeout and a fresh instance is
+# started from the archive. The instance is also recycled (closed and started
+# again) before an evaluation once it has done `max_runs` runs or its memory has
+# grown past `max_memory_mb`. `backend_factory` creates an instance of the wrapped
+# backend, which must provide kill() (and memory_mb() for the memory limit); an
+# instance whose process cannot be found (`can_kill` false, e.g. AspenBackend
+# without psutil) is refused with ValueError when a timeout or memory limit is set,
+# instead of the limit silently never acting.
+class Watchdog:
+    def __init__(self, backend_factory, timeout=None, max_runs=None, max_memory_mb=None):
+        self.timeout = timeout
+        self.max_runs = max_runs
+        self.max_memory_mb = max_memory_mb
+        self.timeouts = 0
+        self.recycles = 0
+        self._backend_factory = backend_factory
+        self._expired = False
+        self._spawn()
+
+    def _spawn(self):
+        self.backend = self._backend_factory()
+        self.name = self.backend.name
+        self.runs = 0
+        if (self.timeout is not None or self.max_memory_mb is not None) and not self.backend.can_kill:
+            self.backend.close()
+            raise ValueError('A run timeout or memory limit needs the simulator process, which is unknown '
+                             '(install psutil for the Aspen Plus backend)')
+
+    def _respawn(self):
+        try:
+            self.backend.close()
+        except Exception:
+            pass  # the process may already be gone
+        self._spawn()
+
+    def _degraded(self):
+        if self.max_runs is not None and self.runs >= self.max_runs:
+            return True
+        return self.max_memory_mb is not None and self.backend.memory_mb() > self.max_memory_mb
+
+    def _expire(self):
+        self._expired = True
+        self.backend.kill()
+
+    def set_inputs(self, inputs):
+        if self._degraded():
+            self.recycles += 1
+            self._respawn()
+        self.backend.set_inputs(inputs)
+
+    def run(self):
+        self.runs += 1
+        if self.timeout is None:
+            self.backend.run()
+            return
+        self._expired = False
+        timer = threading.Timer(self.timeout, self._expire)
+        timer.daemon = True
+        timer.start()
+        try:
+            self.backend.run()
+        except Exception:
+            if not self._expired:
+                raise
+        finally:
+            timer.cancel()
+            timer.join()
+        if self._expired:
+            self.timeouts += 1
+            self._respawn()
+            raise SimulationTimeout(f"Run stopped after {self.timeout:g} s; simulator restarted from the archive")
+
+    def converged(self):
+        return self.backend.converged()
+
+    def read_outputs(self, names):
+        return self.backend.read_outputs(names)
+
+    def reload(self):
+        self.backend.reload()
+
+    def close(self):
+        self.backend.close()
+
+    def summary(self):
+        return f"Watchdog: {self.timeouts} runs timed out, {self.recycles} instances recycled"
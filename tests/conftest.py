@@ -0,0 +1,18 @@
+import os
+
+import pytest
+
+from aspen_opt.standin import REPO_DIR
+
+# The stand-in needs no model file; the path only names the model in the result store
+MODEL_PATH = os.path.join(REPO_DIR, 'UTAA_revK.bkp')
+
+
+# Every test runs on the deterministic, instantaneous stand-in flowsheet, whatever
+# the environment of the shell
+@pytest.fixture(autouse=True)
+def standin_backend(monkeypatch):
+    for name in list(os.environ):
+        if name.startswith('ASPEN_'):
+            monkeypatch.delenv(name)
+    monkeypatch.setenv('ASPEN_BACKEND', 'standin')
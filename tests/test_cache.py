@@ -0,0 +1,40 @@
+from aspen_opt.cache import SimulationCache
+
+
+def test_hit_and_miss_are_counted():
+    cache = SimulationCache()
+    assert cache.get([1.0, 2.0]) is None
+    cache.put([1.0, 2.0], 'a')
+    assert cache.get([1.0, 2.0]) == 'a'
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert [1.0, 2.0] in cache
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_points_within_tol_share_an_entry_across_grid_cells():
+    cache = SimulationCache(tol=1e-3)
+    cache.put([0.0009999, 0.5], 'a')
+    assert cache.get([0.0010005, 0.5]) == 'a'
+    assert cache.get([0.0021, 0.5]) is None
+    cache.put([0.0010005, 0.5], 'b')
+    assert len(cache) == 1
+    assert cache.get([0.0009999, 0.5]) == 'b'
+
+
+def test_zero_tol_matches_exact_points_only():
+    cache = SimulationCache(tol=0)
+    cache.put([1.0], 'a')
+    assert cache.get([1.0]) == 'a'
+    assert cache.get([1.0 + 1e-12]) is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = SimulationCache(maxsize=2)
+    cache.put([1.0], 'a')
+    cache.put([2.0], 'b')
+    cache.get([1.0])
+    cache.put([3.0], 'c')
+    assert len(cache) == 2
+    assert cache.get([2.0]) is None
+    assert cache.get([1.0]) == 'a'
+    assert cache.get([3.0]) == 'c'
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from aspen_opt import bayesopt
+from aspen_opt.lagrangian import augmented_lagrangian_minimize
+from aspen_opt.optimizer import OptimizationRun
+from aspen_opt.problem import PROBLEMS
+from tests.conftest import MODEL_PATH
+
+
+def optimization_run(tmp_path, store_name, method='COBYLA', **options):
+    return OptimizationRun(MODEL_PATH, 4, method, output_dir=str(tmp_path), backend='standin',
+                           store_path=str(tmp_path / store_name), **options)
+
+
+def test_resume_replays_to_the_same_optimum(tmp_path):
+    (tmp_path / 'reference').mkdir()
+    reference_run = optimization_run(tmp_path / 'reference', 'results.sqlite')
+    reference = reference_run.run()
+
+    interrupted = optimization_run(tmp_path, 'interrupted.sqlite')
+    record = interrupted.simulator.on_result
+
+    def interrupt_after_20(point, result, elapsed_s):
+        record(point, result, elapsed_s)
+        if interrupted.simulations == 20:
+            raise KeyboardInterrupt
+
+    interrupted.simulator.on_result = interrupt_after_20
+    with pytest.raises(KeyboardInterrupt):
+        interrupted.run()
+
+    # Empty store: only the checkpoint can spare the first 20 simulations
+    resumed_run = optimization_run(tmp_path, 'resumed.sqlite')
+    resumed = resumed_run.run(resume=True)
+    np.testing.assert_allclose(resumed.x, reference.x)
+    assert resumed.fun == pytest.approx(reference.fun)
+    assert resumed_run.checkpoint.replayed == 20
+    assert resumed_run.simulations == reference_run.simulations - 20
+
+
+def test_augmented_lagrangian_with_no_iterations_returns_x0():
+    x0 = np.array([0.5, 0.5])
+    result = augmented_lagrangian_minimize(lambda x: float(x @ x), lambda x: 2 * x, lambda x: np.array([1 + x[0]]),
+                                           lambda x: np.array([[1.0, 0.0]]), x0, [(-1, 1)] * 2, [1.2], maxiter=0)
+    assert result.nit == 0
+    np.testing.assert_array_equal(result.x, x0)
+    assert not result.success
+
+
+def test_no_feasible_result_is_reported_not_raised(tmp_path):
+    run = optimization_run(tmp_path, 'results.sqlite', options={'maxiter': 30}, limits={'H2S': 1e-6, 'NH3': 1e-6})
+    result = run.run()
+    assert run.max_violation(result.x) > 0
+    assert run.simulations_to_optimum(result.fun) is None
+    assert run.time_to_optimum(result.fun) is None
+
+
+def test_compare_without_a_feasible_run(tmp_path, monkeypatch):
+    monkeypatch.setitem(PROBLEMS, 3, PROBLEMS[3].with_limits({'H2S': 1e-6, 'NH3': 1e-6}))
+    table = bayesopt.compare(MODEL_PATH, 3, q=2, max_simulations=8, output_dir=str(tmp_path), backend='standin')
+    assert all(line.split()[-1] == '-' for line in table.splitlines()[1:])
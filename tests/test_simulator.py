@@ -0,0 +1,78 @@
+import threading
+from functools import partial
+
+import pytest
+
+from aspen_opt.backends import is_failed, make_backend
+from aspen_opt.pool import SimulatorPool
+from aspen_opt.problem import PROBLEMS
+from aspen_opt.simulator import SharedSimulator
+from aspen_opt.store import ResultStore
+from tests.conftest import MODEL_PATH
+
+X0 = PROBLEMS[4].x0
+
+
+def pool(size=2, **options):
+    return SimulatorPool(partial(make_backend, MODEL_PATH, 'standin', **options), size=size)
+
+
+def test_pool_futures_carry_results_and_solve_time():
+    with pool() as simulators:
+        futures = [simulators.submit(dict(zip(PROBLEMS[4].names, x))) for x in [X0, [600000, 950000, 3, 0.5]]]
+        results = [future.result() for future in futures]
+    assert results[0][0] > results[1][0]  # more reboiler duty strips more H2S
+    assert all(future.elapsed_s >= 0 for future in futures)
+
+
+def test_batch_dedups_cached_and_repeated_points(tmp_path):
+    store = ResultStore(MODEL_PATH, path=str(tmp_path / 'results.sqlite'), backend='standin')
+    with pool() as simulators:
+        simulator = SharedSimulator(simulators, PROBLEMS[4].names, store)
+        first = simulator.simulate_batch([X0, X0, [600000, 950000, 3, 0.5]])
+        assert first[0] == first[1]
+        assert simulator(X0) == first[0]
+        assert simulator.simulations == 2
+
+        # A new simulator on the same store simulates nothing
+        again = SharedSimulator(simulators, PROBLEMS[4].names, store)
+        assert again(X0) == first[0]
+        assert again.simulations == 0
+    store.close()
+
+
+def test_point_in_flight_is_simulated_once():
+    with pool(size=4, latency=0.2) as simulators:
+        simulator = SharedSimulator(simulators, PROBLEMS[4].names)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(simulator(X0))) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert len(results) == 4 and len(set(results)) == 1
+    assert simulator.simulations == 1
+
+
+def test_failed_points_are_kept_apart(tmp_path):
+    store = ResultStore(MODEL_PATH, path=str(tmp_path / 'results.sqlite'), backend='standin')
+    with pool(failure_rate=1.0) as simulators:
+        simulator = SharedSimulator(simulators, PROBLEMS[4].names, store, failure_ppm=1e3)
+        result = simulator(X0)
+        assert is_failed(result)
+        assert result[:2] == (1e3, 1e3)
+        assert X0 in simulator.failures and X0 not in simulator.cache
+        assert store.get(X0) is None
+        # The failure is remembered: asking again does not simulate again
+        assert is_failed(simulator(X0))
+        assert simulator.simulations == 1
+    store.close()
+
+
+@pytest.mark.parametrize('tol, simulations', [(1e-9, 2), (1e-3, 1)])
+def test_cache_tol_merges_nearby_points(tol, simulations):
+    with pool() as simulators:
+        simulator = SharedSimulator(simulators, PROBLEMS[4].names, cache_tol=tol)
+        simulator([5.6, 9.5, 3.0, 0.5])
+        simulator([5.6 + 1e-4, 9.5, 3.0, 0.5])
+    assert simulator.simulations == simulations
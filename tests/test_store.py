@@ -0,0 +1,34 @@
+from aspen_opt.store import ResultStore
+from tests.conftest import MODEL_PATH
+
+RESULT = (0.15, 12.5, (168.4, 108.0, 104.2))
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / 'results.sqlite')
+    store = ResultStore(MODEL_PATH, path=path, backend='standin')
+    store.put([560000, 950000, 3, 0.5], RESULT)
+    store.close()
+
+    store = ResultStore(MODEL_PATH, path=path, backend='standin')
+    assert store.get([560000, 950000, 3, 0.5]) == RESULT
+    assert store.get([560000, 950000, 3, 0.6]) is None
+    assert (store.hits, store.misses, len(store)) == (1, 1, 1)
+    store.close()
+
+
+def test_failed_runs_are_not_returned(tmp_path):
+    store = ResultStore(MODEL_PATH, path=str(tmp_path / 'results.sqlite'), backend='standin')
+    store.put([560000, 950000, 3, 0.5], RESULT, status='failed')
+    assert store.get([560000, 950000, 3, 0.5]) is None
+    store.close()
+
+
+def test_backends_are_kept_apart(tmp_path):
+    path = str(tmp_path / 'results.sqlite')
+    standin = ResultStore(MODEL_PATH, path=path, backend='standin')
+    standin.put([560000, 950000, 3, 0.5], RESULT)
+    other = ResultStore('other.bkp', path=path, backend='standin')
+    assert other.get([560000, 950000, 3, 0.5]) is None
+    standin.close()
+    other.close()
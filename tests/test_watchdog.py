@@ -0,0 +1,40 @@
+from functools import partial
+
+import pytest
+
+from aspen_opt.backends import SimulationTimeout, evaluate
+from aspen_opt.problem import PROBLEMS
+from aspen_opt.standin import StandInBackend
+from aspen_opt.watchdog import Watchdog
+
+INPUTS = dict(zip(PROBLEMS[4].names, PROBLEMS[4].x0))
+
+
+def test_hung_run_times_out_and_respawns():
+    watchdog = Watchdog(partial(StandInBackend, hang_rate=1.0), timeout=0.1)
+    hung = watchdog.backend
+    with pytest.raises(SimulationTimeout):
+        evaluate(watchdog, INPUTS, retries=0)
+    assert watchdog.timeouts == 1
+    assert watchdog.backend is not hung
+
+    # The fresh instance runs normally
+    watchdog.backend.hang_rate = 0.0
+    H2S_ppm, NH3_ppm, _ = evaluate(watchdog, INPUTS)
+    assert H2S_ppm > 0 and NH3_ppm > 0
+
+
+def test_instance_is_recycled_after_max_runs():
+    watchdog = Watchdog(StandInBackend, max_runs=2)
+    for _ in range(5):
+        evaluate(watchdog, INPUTS)
+    assert watchdog.recycles == 2
+    assert watchdog.runs == 1
+
+
+def test_timeout_needs_a_killable_backend():
+    class Unkillable(StandInBackend):
+        can_kill = False
+
+    with pytest.raises(ValueError):
+        Watchdog(Unkillable, timeout=1.0)